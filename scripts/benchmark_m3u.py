@@ -0,0 +1,258 @@
+import argparse
+import contextlib
+import gc
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import generate_m3u
+
+# 仓库根目录及默认的基准测试语料（均为已提交的真实输出）
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+DEFAULT_CORPUS = ["yifa.m3u", "vinkerq.m3u", "tv1288.m3u", "kulao.m3u", "lzo_live.m3u"]
+
+_ATTR_PATTERN = re.compile(r'([\w-]+)="([^"]*)"')
+
+def load_corpus(path):
+    """读取M3U文件，转换为直播源使用的 txt/#genre# 列表格式
+
+    同时从 tvg-id/tvg-name/tvg-logo 属性中提取EPG和Logo数据（与 snow_epg.json 和 logo.json 格式一致），
+    返回 (列表文本, EPG列表, Logo列表)
+    """
+    list_lines = []
+    epg_channels = []
+    logos = []
+    seen_epg_names = set()
+    current_group = None
+    extinf = None
+
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("#EXTINF"):
+                extinf = line
+                continue
+            if not line or line.startswith("#") or extinf is None:
+                continue
+
+            attrs = dict(_ATTR_PATTERN.findall(extinf))
+            channel_name = extinf.rsplit('",', 1)[-1] if '",' in extinf else extinf.split(",", 1)[-1]
+            group = attrs.get("group-title", "默认分组")
+            if group != current_group:
+                list_lines.append(f"{group},#genre#")
+                current_group = group
+            list_lines.append(f"{channel_name},{line}")
+
+            tvg_name = attrs.get("tvg-name")
+            if attrs.get("tvg-id") and tvg_name and tvg_name not in seen_epg_names:
+                seen_epg_names.add(tvg_name)
+                epg_channels.append({"channel_id": attrs["tvg-id"], "channel_name": tvg_name})
+            if attrs.get("tvg-logo"):
+                logos.append({"logo_name": tvg_name or channel_name, "logo_url": attrs["tvg-logo"]})
+            extinf = None
+
+    return "\n".join(list_lines), epg_channels, logos
+
+def load_json_fixture(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def build_logo_index(logos):
+    """与 main() 相同的方式构建Logo索引"""
+    return generate_m3u.build_logo_index([generate_m3u.parse_logo_data(json.dumps(logos))])
+
+def measure(func, repeat, measure_memory):
+    """运行阶段函数，返回 (最短耗时秒数, 内存峰值字节数)
+
+    每次运行前清空名称缓存，测量的是冷启动下的真实开销
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        generate_m3u.clear_name_caches()
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    peak = None
+    if measure_memory:
+        generate_m3u.clear_name_caches()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return best, peak
+
+def benchmark_file(path, epg_channels=None, logos=None, repeat=3, measure_memory=True, fuzzy_threshold=0.8):
+    """对单个语料文件运行所有阶段，返回 {阶段: 结果}"""
+    list_data, corpus_epg, corpus_logos = load_corpus(path)
+    epg_channels = corpus_epg if epg_channels is None else epg_channels
+    logos = corpus_logos if logos is None else logos
+
+    epg_index = generate_m3u.build_epg_index(epg_channels)
+    logo_index = build_logo_index(logos)
+
+    # 各阶段的输入提前准备好，不计入该阶段的耗时
+    parser = generate_m3u.ChannelListParser()
+    records = [(channel.group, channel.name, channel.url) for channel in parser.parse(generate_m3u.iter_text_lines(list_data))]
+    total_lines = parser.total_lines
+    names = [channel_name for _, channel_name, _ in records]
+    cleaned_names = [generate_m3u.clean_channel_name(name) for name in names]
+    norm_names = generate_m3u.normalize_channel_names(cleaned_names)
+    # 模糊匹配只用于精确匹配失败的名称
+    fuzzy_names = [epg_name for epg_name in (generate_m3u.strip_resolution_suffix(norm_name) for norm_name in norm_names)
+                   if epg_name not in epg_index]
+    fuzzy_matcher = generate_m3u.FuzzyEpgMatcher(epg_index, fuzzy_threshold)
+    epg_grams = [generate_m3u._char_bigrams(generate_m3u._fuzzy_key(epg_name)) for epg_name in epg_index]
+
+    def fuzzy_match():
+        # 每次运行前清空匹配器的缓存，测量的是实际查找的开销
+        fuzzy_matcher.clear_cache()
+        return [fuzzy_matcher.match(name) for name in fuzzy_names]
+
+    def fuzzy_scan():
+        """对照：逐个与所有EPG频道计算相似度（不使用倒排索引）"""
+        for name in fuzzy_names:
+            grams = generate_m3u._char_bigrams(generate_m3u._fuzzy_key(name))
+            max((2 * len(grams & other) / (len(grams) + len(other)) for other in epg_grams), default=0)
+
+    def fresh_channels():
+        # 处理会原地修改频道对象，每次运行使用新的未清洗频道
+        return (generate_m3u.Channel(group, name, url) for group, name, url in records)
+
+    channels = list(generate_m3u.iter_channels(fresh_channels(), epg_index, logo_index))
+
+    output_dir = tempfile.mkdtemp(prefix="m3u_bench_")
+    output_path = os.path.join(output_dir, "bench.m3u")
+
+    def write_output():
+        generate_m3u.write_m3u(output_path, channels, gzip_copy=False)
+
+    def write_gzip_output():
+        generate_m3u.write_m3u(output_path, channels, gzip_copy=True)
+
+    stages = [
+        # (阶段, 处理单位, 单位数量, 阶段函数)
+        ("parse", "lines", total_lines,
+         lambda: sum(1 for _ in generate_m3u.ChannelListParser().parse(generate_m3u.iter_text_lines(list_data)))),
+        ("clean", "names", len(names),
+         lambda: [generate_m3u.clean_channel_name(name) for name in names]),
+        ("normalize", "names", len(cleaned_names),
+         lambda: generate_m3u.normalize_channel_names(cleaned_names)),
+        ("match", "channels", len(norm_names),
+         lambda: [generate_m3u.match_channel(norm_name, epg_index, logo_index) for norm_name in norm_names]),
+        ("fuzzy_index", "epg", len(epg_index),
+         lambda: generate_m3u.FuzzyEpgMatcher(epg_index, fuzzy_threshold)),
+        ("fuzzy", "names", len(fuzzy_names), fuzzy_match),
+        ("fuzzy_scan", "names", len(fuzzy_names), fuzzy_scan),
+        ("pipeline", "channels", len(records),
+         lambda: sum(1 for _ in generate_m3u.iter_channels(fresh_channels(), epg_index, logo_index))),
+        ("write", "channels", len(channels), write_output),
+        ("write_gz", "channels", len(channels), write_gzip_output),
+    ]
+
+    results = {}
+    try:
+        for stage, unit, count, func in stages:
+            seconds, peak = measure(func, repeat, measure_memory)
+            results[stage] = {
+                "unit": unit,
+                "count": count,
+                "seconds": seconds,
+                "throughput": count / seconds if seconds > 0 else 0.0,
+                "peak_kb": peak / 1024 if peak is not None else None,
+            }
+    finally:
+        for filename in os.listdir(output_dir):
+            os.remove(os.path.join(output_dir, filename))
+        os.rmdir(output_dir)
+    return results
+
+def print_results(results):
+    for filename, stages in results["files"].items():
+        print(f"\n{filename}")
+        print(f"  {'阶段':<10}{'数量':>10}{'耗时(ms)':>12}{'吞吐量':>22}{'内存峰值(KB)':>16}")
+        for stage, result in stages.items():
+            throughput = f"{result['throughput']:,.0f} {result['unit']}/s"
+            peak = f"{result['peak_kb']:,.0f}" if result["peak_kb"] is not None else "-"
+            print(f"  {stage:<10}{result['count']:>10}{result['seconds'] * 1000:>12.1f}{throughput:>22}{peak:>16}")
+
+def compare_results(baseline, current, threshold=0.1):
+    """对比两次运行的吞吐量，返回回归（变慢超过阈值）的 (文件, 阶段) 列表"""
+    regressions = []
+    print(f"\n与基准对比（吞吐量下降超过 {threshold:.0%} 视为回归）")
+    for filename, stages in current["files"].items():
+        baseline_stages = baseline.get("files", {}).get(filename)
+        if not baseline_stages:
+            print(f"  {filename}: 基准中没有该文件，跳过")
+            continue
+        for stage, result in stages.items():
+            old = baseline_stages.get(stage)
+            if not old or not old["throughput"]:
+                continue
+            change = result["throughput"] / old["throughput"] - 1
+            mark = ""
+            if change < -threshold:
+                mark = "  <-- 回归"
+                regressions.append((filename, stage))
+            print(f"  {filename:<16}{stage:<10}{old['throughput']:>14,.0f} -> {result['throughput']:>14,.0f} {result['unit']}/s ({change:+.1%}){mark}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="generate_m3u.py 各阶段的离线基准测试（使用仓库中的M3U文件作为语料）")
+    parser.add_argument("files", nargs="*", help=f"语料M3U文件，默认: {' '.join(DEFAULT_CORPUS)}")
+    parser.add_argument("--epg", help="EPG数据JSON（snow_epg.json格式），默认从语料的tvg属性中提取")
+    parser.add_argument("--logo", help="Logo数据JSON（logo.json格式），默认从语料的tvg属性中提取")
+    parser.add_argument("--repeat", type=int, default=3, help="每个阶段运行的次数，取最快的一次（默认3）")
+    parser.add_argument("--no-memory", action="store_true", help="不测量内存峰值（tracemalloc会额外运行一次）")
+    parser.add_argument("--fuzzy-threshold", type=float, default=0.8, help="EPG模糊匹配阶段使用的阈值（默认0.8）")
+    parser.add_argument("--save", help="将结果保存为JSON文件")
+    parser.add_argument("--compare", help="与之前保存的结果JSON对比")
+    parser.add_argument("--threshold", type=float, default=0.1, help="判定回归的吞吐量下降比例（默认0.1）")
+    parser.add_argument("--fail-on-regression", action="store_true", help="存在回归时以非零状态退出")
+    args = parser.parse_args(argv)
+
+    files = args.files or [os.path.join(REPO_ROOT, filename) for filename in DEFAULT_CORPUS]
+    epg_channels = load_json_fixture(args.epg) if args.epg else None
+    logos = load_json_fixture(args.logo) if args.logo else None
+
+    results = {
+        "ruleset_version": generate_m3u.RULESET_VERSION,
+        "python": sys.version.split()[0],
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "files": {},
+    }
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        for path in files:
+            if not os.path.exists(path):
+                print(f"跳过不存在的文件: {path}")
+                continue
+            print(f"正在测试: {path}", file=sys.stderr)
+            # 屏蔽被测函数的日志输出（输出本身的开销仍计入耗时）
+            with contextlib.redirect_stdout(devnull):
+                results["files"][os.path.basename(path)] = benchmark_file(
+                    path, epg_channels, logos, repeat=args.repeat, measure_memory=not args.no_memory,
+                    fuzzy_threshold=args.fuzzy_threshold)
+
+    print_results(results)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存到 {args.save}")
+
+    if args.compare:
+        regressions = compare_results(load_json_fixture(args.compare), results, args.threshold)
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
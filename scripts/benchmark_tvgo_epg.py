@@ -0,0 +1,199 @@
+import argparse
+import contextlib
+import gc
+import os
+import re
+import sys
+import tempfile
+import time
+
+import get_tvgo_epg
+
+# 仓库根目录及默认的基准测试语料（已提交的真实输出）
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+DEFAULT_XMLTV = os.path.join(REPO_ROOT, "epg", "tvgo.xml")
+
+_PROGRAMME_PATTERN = re.compile(
+    r'<programme channel="[^"]*" start="(\d{14}) [^"]*" stop="(\d{14}) [^"]*">\s*<title lang="zh">([^<]*)</title>')
+
+def _js_string(value):
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+def build_fixture_html(xml_path, scale=1):
+    """根据XMLTV文件还原TVKing频道页面（Vue数据中的 scheduleList），scale 为节目表重复的次数
+
+    节目标题中的引号和括号原样保留在字符串中，用于检验解析器不会被字符串内容干扰
+    """
+    with open(xml_path, "r", encoding="utf-8") as f:
+        xml = f.read()
+
+    days = {}
+    for start, stop, title in _PROGRAMME_PATTERN.findall(xml):
+        date = f"{start[:4]}-{start[4:6]}-{start[6:8]}"
+        days.setdefault(date, []).append((f"{start[8:10]}:{start[10:12]}:{start[12:14]}",
+                                          f"{stop[8:10]}:{stop[10:12]}:{stop[12:14]}",
+                                          title.replace("&amp;", "&").replace("&lt;", "<").replace("&quot;", '"').replace("&gt;", ">")))
+
+    day_literals = []
+    for _ in range(scale):
+        for date, programmes in days.items():
+            items = [f"{{'timeS': '{time_start}', 'timeE': '{time_end}', 'program': {_js_string(title)}}}"
+                     for time_start, time_end, title in programmes]
+            items.append("{'program': 'ads'}")
+            day_literals.append(f"{{'date': '{date}', 'programList': [{', '.join(items)}]}}")
+
+    return ("<!DOCTYPE html><html><head><title>TVKing</title></head><body><div id=\"app\"></div>\n"
+            "<script>\nnew Vue({\n  el: '#app',\n  data: {\n    channel: {id: 325},\n"
+            f"    scheduleList: [{', '.join(day_literals)}],\n"
+            "    loading: false\n  }\n});\n</script></body></html>\n")
+
+def legacy_extract(html_content):
+    """对照：之前逐字符匹配括号并用eval解析的实现"""
+    start_marker = 'scheduleList: ['
+    start_idx = html_content.find(start_marker)
+    if start_idx == -1:
+        return None
+    bracket_count = 0
+    i = start_idx + len(start_marker) - 1
+    while i < len(html_content):
+        char = html_content[i]
+        if char == '[':
+            bracket_count += 1
+        elif char == ']':
+            bracket_count -= 1
+            if bracket_count == 0:
+                end_idx = i + 1
+                break
+        i += 1
+    else:
+        return None
+    array_str = html_content[start_idx + len(start_marker) - 1:end_idx].replace("'", '"')
+    try:
+        return eval(array_str)
+    except Exception:
+        return None
+
+def measure(func, repeat):
+    """运行阶段函数，返回最短耗时秒数"""
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def benchmark_page(html, repeat=5):
+    """对单个页面运行所有阶段，返回 ({阶段: 结果}, 节目数, 旧实现的解析结果是否一致)"""
+    schedule_data = get_tvgo_epg.extract_schedule_list(html)
+    if schedule_data is None:
+        raise ValueError("页面中没有可解析的 scheduleList")
+    programmes = list(get_tvgo_epg.iter_programmes(schedule_data))
+
+    legacy_data = legacy_extract(html)
+    legacy_ok = legacy_data == schedule_data
+
+    # 完整解析器（标题中含双引号或转义字符时使用的路径）
+    literal_start = get_tvgo_epg._SCHEDULE_LIST_PATTERN.search(html).end() - 1
+    literal = html[literal_start:get_tvgo_epg.find_js_array_end(html, literal_start)]
+
+    output_dir = tempfile.mkdtemp(prefix="tvgo_bench_")
+    output_path = os.path.join(output_dir, "bench.xml")
+
+    def write_output():
+        with get_tvgo_epg.XmltvWriter(output_path, {"source-info-name": "TVKing"}) as writer:
+            writer.write_channel("bench", "bench")
+            for start, stop, title in programmes:
+                writer.write_programme("bench", start, stop, title)
+
+    size_kb = len(html.encode("utf-8")) / 1024
+    stages = [
+        # (阶段, 处理单位, 单位数量, 阶段函数)
+        ("extract", "KB", size_kb, lambda: get_tvgo_epg.extract_schedule_list(html)),
+        ("parse", "KB", size_kb, lambda: get_tvgo_epg.parse_js_literal(literal)),
+        ("legacy", "KB", size_kb, lambda: legacy_extract(html)),
+        ("programmes", "programmes", len(programmes), lambda: list(get_tvgo_epg.iter_programmes(schedule_data))),
+        ("write", "programmes", len(programmes), write_output),
+    ]
+
+    results = {}
+    try:
+        for stage, unit, count, func in stages:
+            seconds = measure(func, repeat)
+            results[stage] = {
+                "unit": unit,
+                "count": count,
+                "seconds": seconds,
+                "throughput": count / seconds if seconds > 0 else 0.0,
+            }
+    finally:
+        for filename in os.listdir(output_dir):
+            os.remove(os.path.join(output_dir, filename))
+        os.rmdir(output_dir)
+    return results, len(programmes), legacy_ok
+
+def build_malformed_html(size):
+    """无法解析的页面：scheduleList 中是 size 个连续空白及注释，之后是非法字符
+
+    解析失败前正则会回溯前导的空白和注释，耗时应当与 size 成线性关系
+    """
+    trivia = " " * size + "// 注释" + " " * size + "\n/* 注释 */" + " " * size
+    return f"<script>new Vue({{data: {{scheduleList: [{trivia}@]}}}});</script>"
+
+def benchmark_malformed(sizes, repeat=5):
+    """对不同大小的畸形页面运行 extract_schedule_list，返回 [(空白数量, 页面KB, 秒数)]"""
+    results = []
+    for size in sizes:
+        html = build_malformed_html(size)
+        if get_tvgo_epg.extract_schedule_list(html) is not None:
+            raise ValueError("畸形页面不应当解析成功")
+        seconds = measure(lambda: get_tvgo_epg.extract_schedule_list(html), repeat)
+        results.append((size, len(html.encode("utf-8")) / 1024, seconds))
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="get_tvgo_epg.py 页面解析及XMLTV写入的离线基准测试")
+    parser.add_argument("files", nargs="*", help="保存的TVKing频道页面HTML，默认根据 epg/tvgo.xml 还原页面")
+    parser.add_argument("--xmltv", default=DEFAULT_XMLTV, help="还原页面使用的XMLTV文件（默认 epg/tvgo.xml）")
+    parser.add_argument("--scale", type=int, default=20, help="还原页面时节目表重复的次数，模拟更大的页面（默认20）")
+    parser.add_argument("--save-fixture", help="将还原的页面保存为HTML文件")
+    parser.add_argument("--repeat", type=int, default=5, help="每个阶段运行的次数，取最快的一次（默认5）")
+    parser.add_argument("--malformed-sizes", type=int, nargs="*", default=[30, 1000, 10000, 100000],
+                        help="畸形页面（连续空白后是非法字符）中空白的数量，检验解析失败时没有回溯爆炸")
+    args = parser.parse_args(argv)
+
+    pages = {}
+    for path in args.files:
+        with open(path, "r", encoding="utf-8") as f:
+            pages[os.path.basename(path)] = f.read()
+    if not pages:
+        html = build_fixture_html(args.xmltv, args.scale)
+        pages[f"{os.path.basename(args.xmltv)} x{args.scale}"] = html
+        if args.save_fixture:
+            with open(args.save_fixture, "w", encoding="utf-8") as f:
+                f.write(html)
+            print(f"页面已保存到 {args.save_fixture}")
+
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        for name, html in pages.items():
+            # 屏蔽被测函数的输出
+            with contextlib.redirect_stdout(devnull):
+                results, programme_count, legacy_ok = benchmark_page(html, args.repeat)
+            print(f"\n{name}（{programme_count} 个节目，旧实现解析结果{'一致' if legacy_ok else '不一致或解析失败'}）")
+            print(f"  {'阶段':<12}{'数量':>12}{'耗时(ms)':>12}{'吞吐量':>26}")
+            for stage, result in results.items():
+                throughput = f"{result['throughput']:,.0f} {result['unit']}/s"
+                print(f"  {stage:<12}{result['count']:>12,.0f}{result['seconds'] * 1000:>12.2f}{throughput:>26}")
+
+        if args.malformed_sizes:
+            with contextlib.redirect_stdout(devnull):
+                malformed = benchmark_malformed(args.malformed_sizes, args.repeat)
+            print("\n畸形页面（连续空白及注释后是非法字符，耗时应与大小成线性关系）")
+            print(f"  {'空白数量':<12}{'大小(KB)':>12}{'耗时(ms)':>12}{'吞吐量':>26}")
+            for size, size_kb, seconds in malformed:
+                throughput = f"{size_kb / seconds if seconds > 0 else 0.0:,.0f} KB/s"
+                print(f"  {size:<12,}{size_kb:>12,.1f}{seconds * 1000:>12.2f}{throughput:>26}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
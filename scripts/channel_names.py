@@ -0,0 +1,53 @@
+"""频道名称的简繁转换，generate_m3u.py 和 generate_tv12_m3u.py 共用
+
+导入本模块没有副作用：zhconv 加载较慢，第一次转换时才导入
+"""
+import hashlib
+import importlib
+import importlib.metadata
+import operator
+from functools import lru_cache
+
+@lru_cache(maxsize=None)
+def zhconv_version():
+    """返回zhconv的版本号，简繁转换字典随版本变化"""
+    try:
+        return importlib.metadata.version("zhconv")
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
+
+@lru_cache(maxsize=None)
+def fingerprint():
+    """转换结果的版本：本模块及zhconv的版本，任一变化时依赖转换结果的缓存和生成记录都应失效"""
+    with open(__file__, "rb") as f:
+        digest = hashlib.sha1(f.read())
+    digest.update(zhconv_version().encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+@lru_cache(maxsize=None)
+def _zh_cn_tables():
+    """根据zhconv的zh-cn词典构建批量转换所需的表
+    
+    返回 (单字转换表, 多字词条的前两个字集合)：名称中不出现任何多字词条的前两个字时，
+    zhconv的最大正向匹配只会用到单字词条，结果与 str.translate 完全一致
+    """
+    zh_cn_dict = importlib.import_module("zhconv.zhconv").getdict('zh-cn')
+    char_table = {ord(word): target for word, target in zh_cn_dict.items() if len(word) == 1}
+    phrase_bigrams = frozenset(word[:2] for word in zh_cn_dict if len(word) > 1)
+    return char_table, phrase_bigrams
+
+def convert_names_to_simplified(names):
+    """批量将（已小写的）名称转为简体，结果与逐个调用 zhconv.convert(name, 'zh-cn') 一致
+    
+    整体一次 translate，只有包含多字词条的名称才逐个调用 convert
+    """
+    char_table, phrase_bigrams = _zh_cn_tables()
+    convert = importlib.import_module("zhconv").convert
+    if any("\n" in name for name in names):
+        return [convert(name, 'zh-cn') for name in names]
+    
+    converted = "\n".join(names).translate(char_table).split("\n")
+    for i, name in enumerate(names):
+        if not phrase_bigrams.isdisjoint(map(operator.add, name, name[1:])):
+            converted[i] = convert(name, 'zh-cn')
+    return converted
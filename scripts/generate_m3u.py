@@ -1,11 +1,32 @@
+import time
+_MODULE_LOAD_STARTED = time.perf_counter()
+
+import argparse
 import requests
 import json
+import logging
 import re
+import sys
 import os
-import time
 import random
-import chardet  # 用于检测编码
-from zhconv import convert  # 用于简繁转换
+import codecs
+import hashlib
+import importlib
+import importlib.metadata
+import importlib.util
+import threading
+import multiprocessing
+import zlib
+import gzip
+from collections import Counter, OrderedDict, defaultdict, deque
+from contextlib import ExitStack, contextmanager
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
+from urllib.parse import urljoin, urlsplit
+# 频道名称的简繁转换（与 generate_tv12_m3u.py 共用，zhconv 在第一次转换时才导入）
+import channel_names
+# chardet（编码检测）加载较慢，只在用到时通过 _import_optional 导入
 
 # 默认请求头
 DEFAULT_HEADERS = {
@@ -21,6 +42,57 @@ DEFAULT_HEADERS = {
     "Cache-Control": "max-age=0",
 }
 
+# 频道按批清洗和标准化的批大小
+CHANNEL_BATCH_SIZE = 2000
+
+# 本地缓存目录（设置环境变量 M3U_CACHE_DIR 后启用磁盘缓存）
+CACHE_DIR = os.environ.get("M3U_CACHE_DIR")
+
+# 上次生成的M3U文件所在目录（默认当前目录）：输出会被移到别处提交时（如工作流中移到仓库根目录），
+# 指向已提交的文件；输入未变化时跳过生成，该文件保持不变
+PREVIOUS_OUTPUT_DIR = os.environ.get("M3U_PREVIOUS_OUTPUT_DIR", "")
+
+# 内存中频道名称缓存的最大条目数
+NAME_CACHE_SIZE = 100000
+
+# 并发处理直播源的线程数（设为1则按顺序逐个处理）
+MAX_WORKERS = int(os.environ.get("M3U_MAX_WORKERS", "4"))
+
+# 清洗、标准化和匹配频道使用的进程数（0表示在当前进程中处理，频道数很多时可设为CPU核数）
+PROCESS_WORKERS = int(os.environ.get("M3U_PROCESS_WORKERS", "0"))
+
+# EPG模糊匹配的相似度阈值（0~1，0表示关闭）：精确匹配失败时，按字符二元组相似度查找最接近的EPG频道
+FUZZY_EPG_THRESHOLD = float(os.environ.get("M3U_FUZZY_EPG_THRESHOLD", "0"))
+
+# 同一主机同时进行的最大请求数
+MAX_REQUESTS_PER_HOST = int(os.environ.get("M3U_MAX_REQUESTS_PER_HOST", "2"))
+
+# HTTP响应缓存：有效期内直接使用磁盘副本（秒，0表示每次都发送条件请求验证），以及缓存总大小上限（MB）
+RESPONSE_CACHE_TTL = int(os.environ.get("M3U_RESPONSE_CACHE_TTL", "0"))
+RESPONSE_CACHE_MAX_MB = int(os.environ.get("M3U_RESPONSE_CACHE_MAX_MB", "200"))
+
+# 频道URL探测（直播源生成后检查每个URL是否可用）："" 不探测，"reorder" 同一频道的可用URL按速度排在前面，
+# "drop" 在排序的同时删除不可用的URL
+PROBE_MODE = os.environ.get("M3U_PROBE", "").lower()
+PROBE_TIMEOUT = float(os.environ.get("M3U_PROBE_TIMEOUT", "5"))
+PROBE_WORKERS = int(os.environ.get("M3U_PROBE_WORKERS", "32"))
+PROBE_MAX_PER_HOST = int(os.environ.get("M3U_PROBE_MAX_PER_HOST", "4"))
+
+# 生成M3U的同时写入gzip压缩的 .m3u.gz 副本（设置 M3U_GZIP=1 开启），以及压缩级别（1~9）
+WRITE_GZIP = os.environ.get("M3U_GZIP", "0") == "1"
+GZIP_LEVEL = int(os.environ.get("M3U_GZIP_LEVEL", "9"))
+
+# 流式写入M3U时每次写入的频道数
+M3U_WRITE_CHUNK = 1000
+
+# 日志级别（DEBUG 会输出每个频道的清洗、分组等明细，默认只输出汇总）
+LOG_LEVEL = os.environ.get("M3U_LOG_LEVEL", "INFO").upper()
+
+logger = logging.getLogger("generate_m3u")
+
+# 运行报告（JSON）的输出路径
+RUN_REPORT_PATH = os.environ.get("M3U_RUN_REPORT", "run_report.json")
+
 # 常见的浏览器 User-Agent 列表
 BROWSER_USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -31,356 +103,965 @@ BROWSER_USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:120.0) Gecko/20100101 Firefox/120.0",
 ]
 
-def clean_channel_name(name):
-    """清洗频道名称，应用所有指定的规则"""
-    if not name:
-        return name
-    
-    original_name = name
-    
-    # 预处理：将下划线替换为空格，以便后续规则匹配
-    name = name.replace('_', ' ')
-    
+_CCTV_MAIN_PART_PATTERN = re.compile(r'(CCTV\d+\+?)\s*.*', re.IGNORECASE)
+
+def _keep_cctv_main_part(name):
+    """第九步：只保留CCTV频道的主要部分（第一次需求中的规则8）"""
+    # 匹配CCTV后面跟着数字和可能的+，然后可能有空格和其他字符
+    cctv_match = _CCTV_MAIN_PART_PATTERN.search(name)
+    if cctv_match and not any(keyword in name for keyword in ['欧洲', '美洲', '北美', '亚洲', '香港', '4K', '8K', '16K']):
+        name = cctv_match.group(1)
+    return name
+
+# 频道名称清洗规则表（按顺序执行，顺序即优先级，不可随意调整）
+# 每个分组为 (预过滤字面量, 规则列表)：
+#   预过滤字面量：名称经 casefold 后至少包含其中之一，该组规则才可能命中；None 表示总是执行
+#   规则：(正则, 替换, 标志)，或接收并返回名称的函数（无法用单个替换表达的特殊规则）
+CHANNEL_NAME_RULES = [
     # 第一步：处理UHD、FHD、HD、超高清、高清、标清等（调整顺序）
-    # 先处理FHD和UHD，避免被HD规则影响
-    name = re.sub(r'\s*FHD\s*$', '', name, flags=re.IGNORECASE)
-    name = re.sub(r'\s*UHD\s*$', '', name, flags=re.IGNORECASE)
-    
-    # 清理掉超高清
-    name = re.sub(r'\s*超高清\s*', '', name, flags=re.IGNORECASE)
-    
-    # 去掉HD相关格式
-    name = re.sub(r'\s*-\s*HD\s*$', '', name, flags=re.IGNORECASE)
-    name = re.sub(r'\s*HD\s*$', '', name, flags=re.IGNORECASE)
-    
-    # 去掉高清（可能有空格也可能没有）
-    name = re.sub(r'\s*高清\s*$', '', name, flags=re.IGNORECASE)
-    name = re.sub(r'高清\s*$', '', name, flags=re.IGNORECASE)
-    
-    # 35. 清洗掉"标清"
-    name = re.sub(r'\s*标清\s*$', '', name, flags=re.IGNORECASE)
-    
-    # 42. 清洗掉"频标"，"频高"
-    name = re.sub(r'\s*频标\s*$', '', name, flags=re.IGNORECASE)
-    name = re.sub(r'\s*频高\s*$', '', name, flags=re.IGNORECASE)
-    
+    (("hd", "高清", "标清", "频标", "频高"), [
+        # 先处理FHD和UHD，避免被HD规则影响
+        (r'\s*FHD\s*$', '', re.IGNORECASE),
+        (r'\s*UHD\s*$', '', re.IGNORECASE),
+        # 清理掉超高清
+        (r'\s*超高清\s*', '', re.IGNORECASE),
+        # 去掉HD相关格式
+        (r'\s*-\s*HD\s*$', '', re.IGNORECASE),
+        (r'\s*HD\s*$', '', re.IGNORECASE),
+        # 去掉高清（可能有空格也可能没有）
+        (r'\s*高清\s*$', '', re.IGNORECASE),
+        (r'高清\s*$', '', re.IGNORECASE),
+        # 35. 清洗掉"标清"
+        (r'\s*标清\s*$', '', re.IGNORECASE),
+        # 42. 清洗掉"频标"，"频高"
+        (r'\s*频标\s*$', '', re.IGNORECASE),
+        (r'\s*频高\s*$', '', re.IGNORECASE),
+    ]),
     # 第二步：处理CCTV5+相关规则
-    # CCTV5+的各种变体
-    name = re.sub(r'CCTV-?5\s*[PPLUS\+⁺＋]', 'CCTV5+', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV5\s*[PPLUS\+⁺＋]', 'CCTV5+', name, flags=re.IGNORECASE)
-    
-    # 处理CCTV5+体育相关
-    name = re.sub(r'CCTV-?5\+.*体育.*', 'CCTV5+', name, flags=re.IGNORECASE)
-    
-    # CCTV5＋清洗为CCTV5+
-    name = re.sub(r'CCTV5＋', 'CCTV5+', name)
-    
+    (("cctv",), [
+        # CCTV5+的各种变体
+        (r'CCTV-?5\s*[PPLUS\+⁺＋]', 'CCTV5+', re.IGNORECASE),
+        (r'CCTV5\s*[PPLUS\+⁺＋]', 'CCTV5+', re.IGNORECASE),
+        # 处理CCTV5+体育相关
+        (r'CCTV-?5\+.*体育.*', 'CCTV5+', re.IGNORECASE),
+        # CCTV5＋清洗为CCTV5+
+        (r'CCTV5＋', 'CCTV5+', 0),
+    ]),
     # 第三步：处理CCTV16 4K相关规则
-    # CCTV164K替换为CCTV16-4K
-    name = re.sub(r'CCTV164K', 'CCTV16-4K', name, flags=re.IGNORECASE)
-    
-    # CCTV16奥林匹克4K相关清洗为CCTV16-4K
-    name = re.sub(r'CCTV-?16\s*奥林匹克.*4K.*', 'CCTV16-4K', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV16\s*奥林匹克.*4K.*', 'CCTV16-4K', name, flags=re.IGNORECASE)
-    
-    # 处理CCTV-16 4K奥林匹克频道等变体
-    name = re.sub(r'CCTV-?16\s*4K\s*奥林匹克.*', 'CCTV16-4K', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV16\s*4K\s*奥林匹克.*', 'CCTV16-4K', name, flags=re.IGNORECASE)
-    
-    # 修复bug：处理CCTV16 4k(试看)等变体
-    name = re.sub(r'CCTV-?16\s*4k\s*.*', 'CCTV16-4K', name, flags=re.IGNORECASE)
-    
-    # CCTV16-4K不清洗（但确保格式正确）
-    name = re.sub(r'CCTV16-4K', 'CCTV16-4K', name, flags=re.IGNORECASE)
-    
+    (("cctv",), [
+        # CCTV164K替换为CCTV16-4K
+        (r'CCTV164K', 'CCTV16-4K', re.IGNORECASE),
+        # CCTV16奥林匹克4K相关清洗为CCTV16-4K
+        (r'CCTV-?16\s*奥林匹克.*4K.*', 'CCTV16-4K', re.IGNORECASE),
+        (r'CCTV16\s*奥林匹克.*4K.*', 'CCTV16-4K', re.IGNORECASE),
+        # 处理CCTV-16 4K奥林匹克频道等变体
+        (r'CCTV-?16\s*4K\s*奥林匹克.*', 'CCTV16-4K', re.IGNORECASE),
+        (r'CCTV16\s*4K\s*奥林匹克.*', 'CCTV16-4K', re.IGNORECASE),
+        # 修复bug：处理CCTV16 4k(试看)等变体
+        (r'CCTV-?16\s*4k\s*.*', 'CCTV16-4K', re.IGNORECASE),
+        # CCTV16-4K不清洗（但确保格式正确）
+        (r'CCTV16-4K', 'CCTV16-4K', re.IGNORECASE),
+    ]),
     # 第四步：处理CCTV4国际频道相关规则
     # CCTV4欧洲、美洲、亚洲的各种英文和中文变体
-    # 欧洲相关
-    name = re.sub(r'CCTV-?4\s*(EUO|Europe|Europe|EUO|OZ)', 'CCTV4欧洲', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV-?4.*欧洲.*', 'CCTV4欧洲', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV-?4.*中文国际.*欧洲.*', 'CCTV4欧洲', name, flags=re.IGNORECASE)
-    
-    # 美洲相关 - 修复bug：添加对"北美"的识别
-    name = re.sub(r'CCTV-?4\s*(AME|America|America|AME|MZ)', 'CCTV4美洲', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV-?4.*(美洲|北美).*', 'CCTV4美洲', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV-?4.*中文国际.*(美洲|北美).*', 'CCTV4美洲', name, flags=re.IGNORECASE)
-    
-    # 亚洲相关
-    name = re.sub(r'CCTV-?4\s*(Asia|Asia|YZ)', 'CCTV4亚洲', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV-?4.*亚洲.*', 'CCTV4亚洲', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV-?4.*中文国际.*亚洲.*', 'CCTV4亚洲', name, flags=re.IGNORECASE)
-    
-    # CCTV4-美洲/欧洲/亚洲去掉横线
-    name = re.sub(r'CCTV4-美洲', 'CCTV4美洲', name)
-    name = re.sub(r'CCTV4-欧洲', 'CCTV4欧洲', name)
-    name = re.sub(r'CCTV4-亚洲', 'CCTV4亚洲', name)
-    
+    (("cctv",), [
+        # 欧洲相关
+        (r'CCTV-?4\s*(EUO|Europe|Europe|EUO|OZ)', 'CCTV4欧洲', re.IGNORECASE),
+        (r'CCTV-?4.*欧洲.*', 'CCTV4欧洲', re.IGNORECASE),
+        (r'CCTV-?4.*中文国际.*欧洲.*', 'CCTV4欧洲', re.IGNORECASE),
+        # 美洲相关 - 修复bug：添加对"北美"的识别
+        (r'CCTV-?4\s*(AME|America|America|AME|MZ)', 'CCTV4美洲', re.IGNORECASE),
+        (r'CCTV-?4.*(美洲|北美).*', 'CCTV4美洲', re.IGNORECASE),
+        (r'CCTV-?4.*中文国际.*(美洲|北美).*', 'CCTV4美洲', re.IGNORECASE),
+        # 亚洲相关
+        (r'CCTV-?4\s*(Asia|Asia|YZ)', 'CCTV4亚洲', re.IGNORECASE),
+        (r'CCTV-?4.*亚洲.*', 'CCTV4亚洲', re.IGNORECASE),
+        (r'CCTV-?4.*中文国际.*亚洲.*', 'CCTV4亚洲', re.IGNORECASE),
+        # CCTV4-美洲/欧洲/亚洲去掉横线
+        (r'CCTV4-美洲', 'CCTV4美洲', 0),
+        (r'CCTV4-欧洲', 'CCTV4欧洲', 0),
+        (r'CCTV4-亚洲', 'CCTV4亚洲', 0),
+    ]),
     # 第五步：处理CCTV4K相关规则
     # CCTV-4K/8K/16K去掉横线，但保留K
-    name = re.sub(r'CCTV-4K', 'CCTV4K', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV-8K', 'CCTV8K', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV-16K', 'CCTV16K', name, flags=re.IGNORECASE)
-    
+    (("cctv",), [
+        (r'CCTV-4K', 'CCTV4K', re.IGNORECASE),
+        (r'CCTV-8K', 'CCTV8K', re.IGNORECASE),
+        (r'CCTV-16K', 'CCTV16K', re.IGNORECASE),
+    ]),
     # 第六步：处理其他CCTV频道的横线（但保留CCTV4K/8K/16K和CCTV16-4K）
     # 注意：这个规则要在4K频道处理后执行
-    name = re.sub(r'CCTV-(\d+[^K]?)', r'CCTV\1', name)
-    
     # 第七步：处理CCTV一位数频道中的0（第一次需求中的规则4）
     # 去掉CCTV一位数频道中的0，但保留两位数频道
     # 匹配CCTV后面跟着0和1-9的数字，或者0和1-9的数字后面有+
-    name = re.sub(r'CCTV0(\d)(?!\d)', r'CCTV\1', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV0(\d)\+', r'CCTV\1+', name, flags=re.IGNORECASE)
-    
+    (("cctv",), [
+        (r'CCTV-(\d+[^K]?)', r'CCTV\1', 0),
+        (r'CCTV0(\d)(?!\d)', r'CCTV\1', re.IGNORECASE),
+        (r'CCTV0(\d)\+', r'CCTV\1+', re.IGNORECASE),
+    ]),
     # 第八步：处理地区前缀和竖线（第一次需求中的规则5）
-    name = re.sub(r'^[^|]+\|', '', name)
-    
+    (("|",), [
+        (r'^[^|]+\|', '', 0),
+    ]),
     # 第九步：处理CCTV频道的主要部分（第一次需求中的规则8）
-    # 只保留CCTV频道的主要部分
-    # 匹配CCTV后面跟着数字和可能的+，然后可能有空格和其他字符
-    cctv_match = re.search(r'(CCTV\d+\+?)\s*.*', name, re.IGNORECASE)
-    if cctv_match and not any(keyword in name for keyword in ['欧洲', '美洲', '北美', '亚洲', '香港', '4K', '8K', '16K']):
-        name = cctv_match.group(1)
-    
+    (("cctv",), [
+        _keep_cctv_main_part,
+    ]),
     # 第十步：处理CCTV专业频道规则（17-28）
     # 按照从具体到一般的顺序
-    name = re.sub(r'CCTV\s*-\s*兵器科技', 'CCTV兵器科技', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV\s*-\s*第一剧场', 'CCTV第一剧场', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV\s*-\s*电视指南', 'CCTV电视指南', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV\s*-\s*风云剧场', 'CCTV风云剧场', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV\s*-\s*风云音乐', 'CCTV风云音乐', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV\s*-\s*风云足球', 'CCTV风云足球', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV\s*-\s*高尔夫网球', 'CCTV高尔夫网球', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV\s*-\s*怀旧剧场', 'CCTV怀旧剧场', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV\s*-\s*女性时尚', 'CCTV女性时尚', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV\s*-\s*世界地理', 'CCTV世界地理', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV\s*-\s*卫生健康', 'CCTV卫生健康', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV\s*-\s*央视台球', 'CCTV央视台球', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV\s*-\s*央视文化精品', 'CCTV央视文化精品', name, flags=re.IGNORECASE)
-    
+    (("cctv",), [
+        (r'CCTV\s*-\s*兵器科技', 'CCTV兵器科技', re.IGNORECASE),
+        (r'CCTV\s*-\s*第一剧场', 'CCTV第一剧场', re.IGNORECASE),
+        (r'CCTV\s*-\s*电视指南', 'CCTV电视指南', re.IGNORECASE),
+        (r'CCTV\s*-\s*风云剧场', 'CCTV风云剧场', re.IGNORECASE),
+        (r'CCTV\s*-\s*风云音乐', 'CCTV风云音乐', re.IGNORECASE),
+        (r'CCTV\s*-\s*风云足球', 'CCTV风云足球', re.IGNORECASE),
+        (r'CCTV\s*-\s*高尔夫网球', 'CCTV高尔夫网球', re.IGNORECASE),
+        (r'CCTV\s*-\s*怀旧剧场', 'CCTV怀旧剧场', re.IGNORECASE),
+        (r'CCTV\s*-\s*女性时尚', 'CCTV女性时尚', re.IGNORECASE),
+        (r'CCTV\s*-\s*世界地理', 'CCTV世界地理', re.IGNORECASE),
+        (r'CCTV\s*-\s*卫生健康', 'CCTV卫生健康', re.IGNORECASE),
+        (r'CCTV\s*-\s*央视台球', 'CCTV央视台球', re.IGNORECASE),
+        (r'CCTV\s*-\s*央视文化精品', 'CCTV央视文化精品', re.IGNORECASE),
+    ]),
     # 第十一步：处理中央新影相关频道（30-32）
-    name = re.sub(r'中央新影\s*-\s*发现之旅', '发现之旅', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV发现之旅', '发现之旅', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV-发现之旅', '发现之旅', name, flags=re.IGNORECASE)
-    
-    name = re.sub(r'中央新影\s*-\s*老故事', '老故事', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV老故事', '老故事', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV-老故事', '老故事', name, flags=re.IGNORECASE)
-    
-    name = re.sub(r'中央新影\s*-\s*中学生', '中学生', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV中学生', '中学生', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV-中学生', '中学生', name, flags=re.IGNORECASE)
-    
+    (("中央新影", "cctv"), [
+        (r'中央新影\s*-\s*发现之旅', '发现之旅', re.IGNORECASE),
+        (r'CCTV发现之旅', '发现之旅', re.IGNORECASE),
+        (r'CCTV-发现之旅', '发现之旅', re.IGNORECASE),
+        (r'中央新影\s*-\s*老故事', '老故事', re.IGNORECASE),
+        (r'CCTV老故事', '老故事', re.IGNORECASE),
+        (r'CCTV-老故事', '老故事', re.IGNORECASE),
+        (r'中央新影\s*-\s*中学生', '中学生', re.IGNORECASE),
+        (r'CCTV中学生', '中学生', re.IGNORECASE),
+        (r'CCTV-中学生', '中学生', re.IGNORECASE),
+    ]),
     # 第十二步：处理CGTN相关规则（重新组织顺序，从具体到一般）
-    # 处理CGTN-、CGTN -等变体，保留后面的内容
-    name = re.sub(r'CGTN\s*-\s*', 'CGTN', name)
-    
-    # 新增：先处理带有"8M1080"后缀的CGTN频道（放在最前面，因为它们是最具体的）
-    name = re.sub(r'CGTN西语\s*8M1080', 'CGTN西班牙语', name)
-    name = re.sub(r'CGTN阿语\s*8M1080', 'CGTN阿拉伯语', name)
-    name = re.sub(r'CGTN俄语\s*8M1080', 'CGTN俄语', name)
-    name = re.sub(r'CGTN法语\s*8M1080', 'CGTN法语', name)
-    name = re.sub(r'CGTN英语\s*8M1080', 'CGTN', name)
-    name = re.sub(r'CGTN\s*8M1080', 'CGTN', name)
-    name = re.sub(r'CGTN纪录\s*8M1080', 'CGTN纪录', name)
-    
-    # 处理CGTN多语言频道（按照从具体到一般的顺序）
-    # 英语相关频道（从具体到一般）
-    name = re.sub(r'CGTN英语新闻频道', 'CGTN', name)
-    name = re.sub(r'CGTN英语新闻', 'CGTN', name)
-    name = re.sub(r'CGTN英语频道', 'CGTN', name)
-    name = re.sub(r'CGTN英语', 'CGTN', name)
-    
-    # 西班牙语相关频道（从具体到一般）
-    name = re.sub(r'CGTN西班牙语国际频道', 'CGTN西班牙语', name)
-    name = re.sub(r'CGTN西班牙语国际', 'CGTN西班牙语', name)
-    name = re.sub(r'CGTN西班牙语频道', 'CGTN西班牙语', name)
-    name = re.sub(r'CGTN西语', 'CGTN西班牙语', name)
-    
-    # 法语相关频道（从具体到一般）
-    name = re.sub(r'CGTN法语国际频道', 'CGTN法语', name)
-    name = re.sub(r'CGTN法语国际', 'CGTN法语', name)
-    name = re.sub(r'CGTN法语频道', 'CGTN法语', name)
-    
-    # 俄语相关频道（从具体到一般）
-    name = re.sub(r'CGTN俄语国际频道', 'CGTN俄语', name)
-    name = re.sub(r'CGTN俄语国际', 'CGTN俄语', name)
-    name = re.sub(r'CGTN俄语频道', 'CGTN俄语', name)
-    
-    # 阿拉伯语相关频道（从具体到一般）
-    name = re.sub(r'CGTN阿拉伯语国际频道', 'CGTN阿拉伯语', name)
-    name = re.sub(r'CGTN阿拉伯语国际', 'CGTN阿拉伯语', name)
-    name = re.sub(r'CGTN阿拉伯语频道', 'CGTN阿拉伯语', name)
-    name = re.sub(r'CGTN阿语', 'CGTN阿拉伯语', name)
-    
-    # 纪录相关频道（从具体到一般）
-    name = re.sub(r'CGTN纪录频道（国际版）', 'CGTN纪录', name)
-    name = re.sub(r'CGTN纪录\(国际版\)', 'CGTN纪录', name)
-    name = re.sub(r'CGTN纪录频道', 'CGTN纪录', name)
-    
-    # 12. "CGTN俄罗斯语"修正为"CGTN俄语"
-    name = re.sub(r'CGTN俄罗斯语', 'CGTN俄语', name, flags=re.IGNORECASE)
-    
-    # 43. "CGTN纪实"修正为"CGTN纪录"
-    name = re.sub(r'CGTN纪实', 'CGTN纪录', name, flags=re.IGNORECASE)
-    
+    (("cgtn",), [
+        # 处理CGTN-、CGTN -等变体，保留后面的内容
+        (r'CGTN\s*-\s*', 'CGTN', 0),
+        # 新增：先处理带有"8M1080"后缀的CGTN频道（放在最前面，因为它们是最具体的）
+        (r'CGTN西语\s*8M1080', 'CGTN西班牙语', 0),
+        (r'CGTN阿语\s*8M1080', 'CGTN阿拉伯语', 0),
+        (r'CGTN俄语\s*8M1080', 'CGTN俄语', 0),
+        (r'CGTN法语\s*8M1080', 'CGTN法语', 0),
+        (r'CGTN英语\s*8M1080', 'CGTN', 0),
+        (r'CGTN\s*8M1080', 'CGTN', 0),
+        (r'CGTN纪录\s*8M1080', 'CGTN纪录', 0),
+        # 处理CGTN多语言频道（按照从具体到一般的顺序）
+        # 英语相关频道（从具体到一般）
+        (r'CGTN英语新闻频道', 'CGTN', 0),
+        (r'CGTN英语新闻', 'CGTN', 0),
+        (r'CGTN英语频道', 'CGTN', 0),
+        (r'CGTN英语', 'CGTN', 0),
+        # 西班牙语相关频道（从具体到一般）
+        (r'CGTN西班牙语国际频道', 'CGTN西班牙语', 0),
+        (r'CGTN西班牙语国际', 'CGTN西班牙语', 0),
+        (r'CGTN西班牙语频道', 'CGTN西班牙语', 0),
+        (r'CGTN西语', 'CGTN西班牙语', 0),
+        # 法语相关频道（从具体到一般）
+        (r'CGTN法语国际频道', 'CGTN法语', 0),
+        (r'CGTN法语国际', 'CGTN法语', 0),
+        (r'CGTN法语频道', 'CGTN法语', 0),
+        # 俄语相关频道（从具体到一般）
+        (r'CGTN俄语国际频道', 'CGTN俄语', 0),
+        (r'CGTN俄语国际', 'CGTN俄语', 0),
+        (r'CGTN俄语频道', 'CGTN俄语', 0),
+        # 阿拉伯语相关频道（从具体到一般）
+        (r'CGTN阿拉伯语国际频道', 'CGTN阿拉伯语', 0),
+        (r'CGTN阿拉伯语国际', 'CGTN阿拉伯语', 0),
+        (r'CGTN阿拉伯语频道', 'CGTN阿拉伯语', 0),
+        (r'CGTN阿语', 'CGTN阿拉伯语', 0),
+        # 纪录相关频道（从具体到一般）
+        (r'CGTN纪录频道（国际版）', 'CGTN纪录', 0),
+        (r'CGTN纪录\(国际版\)', 'CGTN纪录', 0),
+        (r'CGTN纪录频道', 'CGTN纪录', 0),
+        # 12. "CGTN俄罗斯语"修正为"CGTN俄语"
+        (r'CGTN俄罗斯语', 'CGTN俄语', re.IGNORECASE),
+        # 43. "CGTN纪实"修正为"CGTN纪录"
+        (r'CGTN纪实', 'CGTN纪录', re.IGNORECASE),
+    ]),
     # 第十三步：处理CCTV错误命名修正为CGTN的规则（2-5）
-    name = re.sub(r'CCTV西班牙语', 'CGTN西班牙语', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV\s*西班牙语', 'CGTN西班牙语', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV西语', 'CGTN西班牙语', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV\s*西语', 'CGTN西班牙语', name, flags=re.IGNORECASE)
-    
-    name = re.sub(r'CCTV法语', 'CGTN法语', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV\s*法语', 'CGTN法语', name, flags=re.IGNORECASE)
-    
-    name = re.sub(r'CCTV阿拉伯语', 'CGTN阿拉伯语', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV\s*阿拉伯语', 'CGTN阿拉伯语', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV阿语', 'CGTN阿拉伯语', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV\s*阿语', 'CGTN阿拉伯语', name, flags=re.IGNORECASE)
-    
-    name = re.sub(r'CCTV俄语', 'CGTN俄语', name, flags=re.IGNORECASE)
-    name = re.sub(r'CCTV\s*俄语', 'CGTN俄语', name, flags=re.IGNORECASE)
-    
     # 第十四步：处理CCTV国际频道简写（7-9）
-    name = re.sub(r'cctv美洲', 'CCTV4美洲', name, flags=re.IGNORECASE)
-    name = re.sub(r'cctv\s*美洲', 'CCTV4美洲', name, flags=re.IGNORECASE)
-    
-    name = re.sub(r'cctv欧洲', 'CCTV4欧洲', name, flags=re.IGNORECASE)
-    name = re.sub(r'cctv\s*欧洲', 'CCTV4欧洲', name, flags=re.IGNORECASE)
-    
-    name = re.sub(r'cctv亚洲', 'CCTV4亚洲', name, flags=re.IGNORECASE)
-    name = re.sub(r'cctv\s*亚洲', 'CCTV4亚洲', name, flags=re.IGNORECASE)
-    
+    (("cctv",), [
+        (r'CCTV西班牙语', 'CGTN西班牙语', re.IGNORECASE),
+        (r'CCTV\s*西班牙语', 'CGTN西班牙语', re.IGNORECASE),
+        (r'CCTV西语', 'CGTN西班牙语', re.IGNORECASE),
+        (r'CCTV\s*西语', 'CGTN西班牙语', re.IGNORECASE),
+        (r'CCTV法语', 'CGTN法语', re.IGNORECASE),
+        (r'CCTV\s*法语', 'CGTN法语', re.IGNORECASE),
+        (r'CCTV阿拉伯语', 'CGTN阿拉伯语', re.IGNORECASE),
+        (r'CCTV\s*阿拉伯语', 'CGTN阿拉伯语', re.IGNORECASE),
+        (r'CCTV阿语', 'CGTN阿拉伯语', re.IGNORECASE),
+        (r'CCTV\s*阿语', 'CGTN阿拉伯语', re.IGNORECASE),
+        (r'CCTV俄语', 'CGTN俄语', re.IGNORECASE),
+        (r'CCTV\s*俄语', 'CGTN俄语', re.IGNORECASE),
+        (r'cctv美洲', 'CCTV4美洲', re.IGNORECASE),
+        (r'cctv\s*美洲', 'CCTV4美洲', re.IGNORECASE),
+        (r'cctv欧洲', 'CCTV4欧洲', re.IGNORECASE),
+        (r'cctv\s*欧洲', 'CCTV4欧洲', re.IGNORECASE),
+        (r'cctv亚洲', 'CCTV4亚洲', re.IGNORECASE),
+        (r'cctv\s*亚洲', 'CCTV4亚洲', re.IGNORECASE),
+    ]),
     # 第十五步：处理中国教育电视台规则（13-16）
-    name = re.sub(r'中国教育1\s*$', '中国教育1台', name, flags=re.IGNORECASE)
-    name = re.sub(r'中国教育\s*1\s*$', '中国教育1台', name, flags=re.IGNORECASE)
-    name = re.sub(r'CETV1\s*$', '中国教育1台', name, flags=re.IGNORECASE)
-    name = re.sub(r'cetv01\s*$', '中国教育1台', name, flags=re.IGNORECASE)
-    name = re.sub(r'CETV\s*1\s*$', '中国教育1台', name, flags=re.IGNORECASE)
-    name = re.sub(r'CETV\s*01\s*$', '中国教育1台', name, flags=re.IGNORECASE)
-    name = re.sub(r'CETV-1\s*$', '中国教育1台', name, flags=re.IGNORECASE)
-    name = re.sub(r'CETV-01\s*$', '中国教育1台', name, flags=re.IGNORECASE)
-    name = re.sub(r'^\s*教育卫视\s*1\S?\s*$', '中国教育1台', name, flags=re.IGNORECASE)
-    name = re.sub(r'^\s*教育卫视\s*01\S?\s*$', '中国教育1台', name, flags=re.IGNORECASE)
-    name = re.sub(r'^\s*教育卫视\s*-\s*1\S?\s*$', '中国教育1台', name, flags=re.IGNORECASE)
-    name = re.sub(r'^\s*教育卫视\s*-\s*01\S?\s*$', '中国教育1台', name, flags=re.IGNORECASE)
-    
-    name = re.sub(r'中国教育2\s*$', '中国教育2台', name, flags=re.IGNORECASE)
-    name = re.sub(r'中国教育\s*2\s*$', '中国教育2台', name, flags=re.IGNORECASE)
-    name = re.sub(r'CETV2\s*$', '中国教育2台', name, flags=re.IGNORECASE)
-    name = re.sub(r'cetv02\s*$', '中国教育2台', name, flags=re.IGNORECASE)
-    name = re.sub(r'CETV\s*2\s*$', '中国教育2台', name, flags=re.IGNORECASE)
-    name = re.sub(r'CETV\s*02\s*$', '中国教育2台', name, flags=re.IGNORECASE)
-    name = re.sub(r'CETV-2\s*$', '中国教育2台', name, flags=re.IGNORECASE)
-    name = re.sub(r'CETV-02\s*$', '中国教育2台', name, flags=re.IGNORECASE)
-    name = re.sub(r'^\s*教育卫视\s*2\S?\s*$', '中国教育2台', name, flags=re.IGNORECASE)
-    name = re.sub(r'^\s*教育卫视\s*02\S?\s*$', '中国教育2台', name, flags=re.IGNORECASE)
-    name = re.sub(r'^\s*教育卫视\s*-\s*2\S?\s*$', '中国教育2台', name, flags=re.IGNORECASE)
-    name = re.sub(r'^\s*教育卫视\s*-\s*02\S?\s*$', '中国教育2台', name, flags=re.IGNORECASE)
-    
-    name = re.sub(r'中国教育3\s*$', '中国教育3台', name, flags=re.IGNORECASE)
-    name = re.sub(r'中国教育\s*3\s*$', '中国教育3台', name, flags=re.IGNORECASE)
-    name = re.sub(r'CETV3\s*$', '中国教育3台', name, flags=re.IGNORECASE)
-    name = re.sub(r'cetv03\s*$', '中国教育3台', name, flags=re.IGNORECASE)
-    name = re.sub(r'CETV\s*3\s*$', '中国教育3台', name, flags=re.IGNORECASE)
-    name = re.sub(r'CETV\s*03\s*$', '中国教育3台', name, flags=re.IGNORECASE)
-    name = re.sub(r'CETV-3\s*$', '中国教育3台', name, flags=re.IGNORECASE)
-    name = re.sub(r'CETV-03\s*$', '中国教育3台', name, flags=re.IGNORECASE)
-    name = re.sub(r'^\s*教育卫视\s*3\S?\s*$', '中国教育3台', name, flags=re.IGNORECASE)
-    name = re.sub(r'^\s*教育卫视\s*03\S?\s*$', '中国教育3台', name, flags=re.IGNORECASE)
-    name = re.sub(r'^\s*教育卫视\s*-\s*3\S?\s*$', '中国教育3台', name, flags=re.IGNORECASE)
-    name = re.sub(r'^\s*教育卫视\s*-\s*03\S?\s*$', '中国教育3台', name, flags=re.IGNORECASE)
-    
-    name = re.sub(r'中国教育4\s*$', '中国教育4台', name, flags=re.IGNORECASE)
-    name = re.sub(r'中国教育\s*4\s*$', '中国教育4台', name, flags=re.IGNORECASE)
-    name = re.sub(r'CETV4\s*$', '中国教育4台', name, flags=re.IGNORECASE)
-    name = re.sub(r'cetv04\s*$', '中国教育4台', name, flags=re.IGNORECASE)
-    name = re.sub(r'CETV\s*4\s*$', '中国教育4台', name, flags=re.IGNORECASE)
-    name = re.sub(r'CETV\s*04\s*$', '中国教育4台', name, flags=re.IGNORECASE)
-    name = re.sub(r'CETV-4\s*$', '中国教育4台', name, flags=re.IGNORECASE)
-    name = re.sub(r'CETV-04\s*$', '中国教育4台', name, flags=re.IGNORECASE)
-    name = re.sub(r'^\s*教育卫视\s*4\S?\s*$', '中国教育4台', name, flags=re.IGNORECASE)
-    name = re.sub(r'^\s*教育卫视\s*04\S?\s*$', '中国教育4台', name, flags=re.IGNORECASE)
-    name = re.sub(r'^\s*教育卫视\s*-\s*4\S?\s*$', '中国教育4台', name, flags=re.IGNORECASE)
-    name = re.sub(r'^\s*教育卫视\s*-\s*04\S?\s*$', '中国教育4台', name, flags=re.IGNORECASE)
-    
+    (("中国教育", "cetv", "教育卫视"), [
+        (r'中国教育1\s*$', '中国教育1台', re.IGNORECASE),
+        (r'中国教育\s*1\s*$', '中国教育1台', re.IGNORECASE),
+        (r'CETV1\s*$', '中国教育1台', re.IGNORECASE),
+        (r'cetv01\s*$', '中国教育1台', re.IGNORECASE),
+        (r'CETV\s*1\s*$', '中国教育1台', re.IGNORECASE),
+        (r'CETV\s*01\s*$', '中国教育1台', re.IGNORECASE),
+        (r'CETV-1\s*$', '中国教育1台', re.IGNORECASE),
+        (r'CETV-01\s*$', '中国教育1台', re.IGNORECASE),
+        (r'^\s*教育卫视\s*1\S?\s*$', '中国教育1台', re.IGNORECASE),
+        (r'^\s*教育卫视\s*01\S?\s*$', '中国教育1台', re.IGNORECASE),
+        (r'^\s*教育卫视\s*-\s*1\S?\s*$', '中国教育1台', re.IGNORECASE),
+        (r'^\s*教育卫视\s*-\s*01\S?\s*$', '中国教育1台', re.IGNORECASE),
+
+        (r'中国教育2\s*$', '中国教育2台', re.IGNORECASE),
+        (r'中国教育\s*2\s*$', '中国教育2台', re.IGNORECASE),
+        (r'CETV2\s*$', '中国教育2台', re.IGNORECASE),
+        (r'cetv02\s*$', '中国教育2台', re.IGNORECASE),
+        (r'CETV\s*2\s*$', '中国教育2台', re.IGNORECASE),
+        (r'CETV\s*02\s*$', '中国教育2台', re.IGNORECASE),
+        (r'CETV-2\s*$', '中国教育2台', re.IGNORECASE),
+        (r'CETV-02\s*$', '中国教育2台', re.IGNORECASE),
+        (r'^\s*教育卫视\s*2\S?\s*$', '中国教育2台', re.IGNORECASE),
+        (r'^\s*教育卫视\s*02\S?\s*$', '中国教育2台', re.IGNORECASE),
+        (r'^\s*教育卫视\s*-\s*2\S?\s*$', '中国教育2台', re.IGNORECASE),
+        (r'^\s*教育卫视\s*-\s*02\S?\s*$', '中国教育2台', re.IGNORECASE),
+
+        (r'中国教育3\s*$', '中国教育3台', re.IGNORECASE),
+        (r'中国教育\s*3\s*$', '中国教育3台', re.IGNORECASE),
+        (r'CETV3\s*$', '中国教育3台', re.IGNORECASE),
+        (r'cetv03\s*$', '中国教育3台', re.IGNORECASE),
+        (r'CETV\s*3\s*$', '中国教育3台', re.IGNORECASE),
+        (r'CETV\s*03\s*$', '中国教育3台', re.IGNORECASE),
+        (r'CETV-3\s*$', '中国教育3台', re.IGNORECASE),
+        (r'CETV-03\s*$', '中国教育3台', re.IGNORECASE),
+        (r'^\s*教育卫视\s*3\S?\s*$', '中国教育3台', re.IGNORECASE),
+        (r'^\s*教育卫视\s*03\S?\s*$', '中国教育3台', re.IGNORECASE),
+        (r'^\s*教育卫视\s*-\s*3\S?\s*$', '中国教育3台', re.IGNORECASE),
+        (r'^\s*教育卫视\s*-\s*03\S?\s*$', '中国教育3台', re.IGNORECASE),
+
+        (r'中国教育4\s*$', '中国教育4台', re.IGNORECASE),
+        (r'中国教育\s*4\s*$', '中国教育4台', re.IGNORECASE),
+        (r'CETV4\s*$', '中国教育4台', re.IGNORECASE),
+        (r'cetv04\s*$', '中国教育4台', re.IGNORECASE),
+        (r'CETV\s*4\s*$', '中国教育4台', re.IGNORECASE),
+        (r'CETV\s*04\s*$', '中国教育4台', re.IGNORECASE),
+        (r'CETV-4\s*$', '中国教育4台', re.IGNORECASE),
+        (r'CETV-04\s*$', '中国教育4台', re.IGNORECASE),
+        (r'^\s*教育卫视\s*4\S?\s*$', '中国教育4台', re.IGNORECASE),
+        (r'^\s*教育卫视\s*04\S?\s*$', '中国教育4台', re.IGNORECASE),
+        (r'^\s*教育卫视\s*-\s*4\S?\s*$', '中国教育4台', re.IGNORECASE),
+        (r'^\s*教育卫视\s*-\s*04\S?\s*$', '中国教育4台', re.IGNORECASE),
+    ]),
     # 第十六步：处理地方卫视修正规则（6,10,11,33,36,37,38,39,40,41,43）
-    # 6. "东方卫视x"修正为"东方卫视"
-    name = re.sub(r'东方卫视x', '东方卫视', name, flags=re.IGNORECASE)
-    
-    # 10. "旅游卫视"修正为"海南卫视"
-    name = re.sub(r'旅游卫视', '海南卫视', name, flags=re.IGNORECASE)
-    
-    # 11. "上海卫视","上海东方卫视","上视东方卫视"修正为"东方卫视"
-    name = re.sub(r'上海卫视', '东方卫视', name, flags=re.IGNORECASE)
-    name = re.sub(r'上海东方卫视', '东方卫视', name, flags=re.IGNORECASE)
-    name = re.sub(r'上视东方卫视', '东方卫视', name, flags=re.IGNORECASE)
-    
-    # 33. "南方卫视","广东湾区"修正为"大湾区卫视"
-    name = re.sub(r'南方卫视', '大湾区卫视', name, flags=re.IGNORECASE)
-    name = re.sub(r'广东湾区', '大湾区卫视', name, flags=re.IGNORECASE)
-    
-    # 36. "福建东南卫视"修正为"东南卫视"
-    name = re.sub(r'福建东南卫视', '东南卫视', name, flags=re.IGNORECASE)
-    
-    # 37. "炫动卡通","炫动卡通频道"修正为"哈哈炫动"
-    name = re.sub(r'炫动卡通频道', '哈哈炫动', name, flags=re.IGNORECASE)
-    name = re.sub(r'炫动卡通', '哈哈炫动', name, flags=re.IGNORECASE)
-    
-    # 38. "生态环境频道"修正为"生态环境"
-    name = re.sub(r'生态环境频道', '生态环境', name, flags=re.IGNORECASE)
-    
-    # 39. "东方纪实"修正为"新纪实"
-    name = re.sub(r'东方纪实', '新纪实', name, flags=re.IGNORECASE)
-    
-    # 40. "北京体育"修正为"北京体育休闲"
-    name = re.sub(r'北京体育\s*$', '北京体育休闲', name, flags=re.IGNORECASE)
+    # 第十七步：处理特殊频道
+    (("东方卫视", "旅游卫视", "上海卫视", "南方卫视", "广东湾区", "东南卫视", "炫动卡通",
+      "生态环境频道", "东方纪实", "北京体育", "北京纪实", "广东经济", "卡酷动画", "北京少儿"), [
+        # 6. "东方卫视x"修正为"东方卫视"
+        (r'东方卫视x', '东方卫视', re.IGNORECASE),
+        # 10. "旅游卫视"修正为"海南卫视"
+        (r'旅游卫视', '海南卫视', re.IGNORECASE),
+        # 11. "上海卫视","上海东方卫视","上视东方卫视"修正为"东方卫视"
+        (r'上海卫视', '东方卫视', re.IGNORECASE),
+        (r'上海东方卫视', '东方卫视', re.IGNORECASE),
+        (r'上视东方卫视', '东方卫视', re.IGNORECASE),
+        # 33. "南方卫视","广东湾区"修正为"大湾区卫视"
+        (r'南方卫视', '大湾区卫视', re.IGNORECASE),
+        (r'广东湾区', '大湾区卫视', re.IGNORECASE),
+        # 36. "福建东南卫视"修正为"东南卫视"
+        (r'福建东南卫视', '东南卫视', re.IGNORECASE),
+        # 37. "炫动卡通","炫动卡通频道"修正为"哈哈炫动"
+        (r'炫动卡通频道', '哈哈炫动', re.IGNORECASE),
+        (r'炫动卡通', '哈哈炫动', re.IGNORECASE),
+        # 38. "生态环境频道"修正为"生态环境"
+        (r'生态环境频道', '生态环境', re.IGNORECASE),
+        # 39. "东方纪实"修正为"新纪实"
+        (r'东方纪实', '新纪实', re.IGNORECASE),
+        # 40. "北京体育"修正为"北京体育休闲"
+        (r'北京体育\s*$', '北京体育休闲', re.IGNORECASE),
+        # 41. "北京纪实"修正为"北京纪实科教"
+        (r'北京纪实\s*$', '北京纪实科教', re.IGNORECASE),
+        # 43. "广东经济"修正为"广东经济科教"
+        (r'广东经济\s*$', '广东经济科教', re.IGNORECASE),
+        # 34. "卡酷动画","北京少儿"修正为"卡酷少儿"
+        (r'卡酷动画', '卡酷少儿', re.IGNORECASE),
+        (r'北京少儿', '卡酷少儿', re.IGNORECASE),
+    ]),
+    # 第十八步：处理Channel V的各种变体（按照从具体到一般的顺序）
+    (("channel v",), [
+        (r'Channel V\s*国际娱乐台.*', 'Channel V', re.IGNORECASE),
+        (r'Channel V国际娱乐台.*', 'Channel V', re.IGNORECASE),
+        (r'Channel V\s*国际娱乐.*', 'Channel V', re.IGNORECASE),
+        (r'Channel V国际娱乐.*', 'Channel V', re.IGNORECASE),
+        (r'Channel V\s*娱乐台.*', 'Channel V', re.IGNORECASE),
+        (r'Channel V娱乐台.*', 'Channel V', re.IGNORECASE),
+        (r'Channel V\s*国际.*', 'Channel V', re.IGNORECASE),
+        (r'Channel V国际.*', 'Channel V', re.IGNORECASE),
+        (r'Channel V\s*娱乐.*', 'Channel V', re.IGNORECASE),
+        (r'Channel V娱乐.*', 'Channel V', re.IGNORECASE),
+    ]),
+    # 第十九步：新增需求：处理广东4K和河北4K（移动到第十八步下方）
+    (("4k",), [
+        (r'广东4K', '广东卫视4K', re.IGNORECASE),
+        (r'广东电视4K', '广东卫视4K', re.IGNORECASE),
+        (r'河北4K', '河北卫视4K', re.IGNORECASE),
+        (r'河北电视4K', '河北卫视4K', re.IGNORECASE),
+    ]),
+    # 第二十步：删除开头只含有中文的"[]","〖〗"以及它们的内容
+    (("[", "〖"), [
+        (r'^\s*[\[〖][\u4e00-\u9fa5]+[\]〗]', '', re.IGNORECASE),
+    ]),
+    # 第二十一步：处理频道名字不完整
+    (("黑龙江视", "内蒙古视"), [
+        # "黑龙江视"修正为"黑龙江卫视"（第一次需求中的规则9）
+        (r'黑龙江视', '黑龙江卫视', 0),
+        # 新增："内蒙古视"修正为"内蒙古卫视"
+        (r'内蒙古视', '内蒙古卫视', 0),
+    ]),
+]
+
+def _compile_channel_name_rules(rule_table):
+    """将规则表编译为 (预过滤字面量, 合并探测正则, [(规则名, 步骤)]) 的分组，只在模块加载时执行一次"""
+    compiled_groups = []
+    for literals, rules in rule_table:
+        steps = []
+        alternatives = []
+        for rule in rules:
+            if callable(rule):
+                steps.append((rule.__name__, rule))
+                alternatives = None
+                continue
+            pattern, repl, flags = rule
+            steps.append((pattern, partial(re.compile(pattern, flags).sub, repl)))
+            if alternatives is not None:
+                prefix = "(?i:" if flags & re.IGNORECASE else "(?:"
+                alternatives.append(prefix + pattern + ")")
+        # 合并探测正则：组内任何一条规则都不命中时，整组可以直接跳过
+        probe = re.compile("|".join(alternatives)).search if alternatives else None
+        compiled_groups.append((literals, probe, steps))
+    return compiled_groups
+
+@lru_cache(maxsize=None)
+def _compiled_channel_name_rules():
+    """编译后的清洗规则（第一次清洗时编译，整个进程只编译一次；不清洗名称的命令不需要编译）"""
+    return _compile_channel_name_rules(CHANNEL_NAME_RULES)
+
+def _code_fingerprint(code):
+    """函数字节码及常量的稳定表示（嵌套的代码对象递归展开，不包含内存地址）"""
+    consts = [_code_fingerprint(const) if hasattr(const, "co_code") else repr(const) for const in code.co_consts]
+    return f"{code.co_code.hex()}:{consts}"
+
+def _ruleset_fingerprint(rule_table):
+    """计算规则表的指纹，规则有任何改动都会得到不同的版本号"""
+    digest = hashlib.sha1()
+    for literals, rules in rule_table:
+        digest.update(repr(literals).encode("utf-8"))
+        for rule in rules:
+            if callable(rule):
+                digest.update(f"{rule.__qualname__}:{_code_fingerprint(rule.__code__)}".encode("utf-8"))
+            else:
+                digest.update(repr(rule).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+# 清洗规则版本：磁盘缓存以此为键，规则变化后旧缓存自动失效
+RULESET_VERSION = _ruleset_fingerprint(CHANNEL_NAME_RULES)
+
+def _file_fingerprint(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:16]
+
+# 生成脚本自身的版本：脚本改动后所有输出都需要重新生成
+GENERATOR_VERSION = _file_fingerprint(__file__)
+
+class LRUCache:
+    """有界的LRU缓存，超出容量时淘汰最久未使用的条目"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        """命中时返回缓存值并标记为最近使用，未命中返回None"""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def update(self, mapping):
+        for key, value in mapping.items():
+            self.put(key, value)
+
+    def to_dict(self):
+        with self._lock:
+            return dict(self._data)
+
+# 频道名称缓存（同一个名称在各个源之间大量重复出现）
+_clean_name_cache = LRUCache(NAME_CACHE_SIZE)
+_normalize_name_cache = LRUCache(NAME_CACHE_SIZE)
+
+# 各清洗规则改变名称的次数（只统计本次运行中新清洗的名称，缓存命中不重复计数）
+_rule_hits = Counter()
+_rule_hits_lock = threading.Lock()
+
+def clear_name_caches():
+    """清空内存中的频道名称缓存"""
+    global _clean_name_cache, _normalize_name_cache
+    _clean_name_cache = LRUCache(NAME_CACHE_SIZE)
+    _normalize_name_cache = LRUCache(NAME_CACHE_SIZE)
+    with _rule_hits_lock:
+        _rule_hits.clear()
+
+def _apply_channel_name_rules(name, rule_hits=None):
+    """按规则表清洗频道名称（不含缓存与日志）
     
-    # 41. "北京纪实"修正为"北京纪实科教"
-    name = re.sub(r'北京纪实\s*$', '北京纪实科教', name, flags=re.IGNORECASE)
+    传入 rule_hits 列表时，把改变了名称的规则名追加到其中
+    """
+    # 预处理：将下划线替换为空格，以便后续规则匹配
+    name = name.replace('_', ' ')
     
-    # 43. "广东经济"修正为"广东经济科教"
-    name = re.sub(r'广东经济\s*$', '广东经济科教', name, flags=re.IGNORECASE)
+    folded_name = name.casefold()
+    for literals, probe, steps in _compiled_channel_name_rules():
+        # 字面量预过滤：名称中不含任何关键字时，该组规则不可能命中
+        if literals and not any(literal in folded_name for literal in literals):
+            continue
+        if probe is not None and not probe(name):
+            continue
+        before = name
+        for label, step in steps:
+            new_name = step(name)
+            if rule_hits is not None and new_name != name:
+                rule_hits.append(label)
+            name = new_name
+        if name != before:
+            folded_name = name.casefold()
     
-    # 第十七步：处理特殊频道
-    # 34. "卡酷动画","北京少儿"修正为"卡酷少儿"
-    name = re.sub(r'卡酷动画', '卡酷少儿', name, flags=re.IGNORECASE)
-    name = re.sub(r'北京少儿', '卡酷少儿', name, flags=re.IGNORECASE)
+    # 去除首尾空格
+    return name.strip()
+
+def clean_channel_name(name):
+    """清洗频道名称，应用所有指定的规则
     
-    # 第十八步：处理Channel V的各种变体（按照从具体到一般的顺序）
-    name = re.sub(r'Channel V\s*国际娱乐台.*', 'Channel V', name, flags=re.IGNORECASE)
-    name = re.sub(r'Channel V国际娱乐台.*', 'Channel V', name, flags=re.IGNORECASE)
-    name = re.sub(r'Channel V\s*国际娱乐.*', 'Channel V', name, flags=re.IGNORECASE)
-    name = re.sub(r'Channel V国际娱乐.*', 'Channel V', name, flags=re.IGNORECASE)
-    name = re.sub(r'Channel V\s*娱乐台.*', 'Channel V', name, flags=re.IGNORECASE)
-    name = re.sub(r'Channel V娱乐台.*', 'Channel V', name, flags=re.IGNORECASE)
-    name = re.sub(r'Channel V\s*国际.*', 'Channel V', name, flags=re.IGNORECASE)
-    name = re.sub(r'Channel V国际.*', 'Channel V', name, flags=re.IGNORECASE)
-    name = re.sub(r'Channel V\s*娱乐.*', 'Channel V', name, flags=re.IGNORECASE)
-    name = re.sub(r'Channel V娱乐.*', 'Channel V', name, flags=re.IGNORECASE)
+    每个改变的名称只在 DEBUG 级别输出，默认通过 log_rule_summary() 输出按规则汇总的次数
+    """
+    if not name:
+        return name
     
-    # 第十九步：新增需求：处理广东4K和河北4K（移动到第十八步下方）
-    name = re.sub(r'广东4K', '广东卫视4K', name, flags=re.IGNORECASE)
-    name = re.sub(r'广东电视4K', '广东卫视4K', name, flags=re.IGNORECASE)
-    name = re.sub(r'河北4K', '河北卫视4K', name, flags=re.IGNORECASE)
-    name = re.sub(r'河北电视4K', '河北卫视4K', name, flags=re.IGNORECASE)
+    cleaned_name = _clean_name_cache.get(name)
+    if cleaned_name is None:
+        hits = []
+        cleaned_name = _apply_channel_name_rules(name, hits)
+        _clean_name_cache.put(name, cleaned_name)
+        if hits:
+            with _rule_hits_lock:
+                _rule_hits.update(hits)
     
-    # 第二十步：删除开头只含有中文的"[]","〖〗"以及它们的内容
-    name = re.sub(r'^\s*[\[〖][\u4e00-\u9fa5]+[\]〗]', '', name, flags=re.IGNORECASE)
+    if cleaned_name != name:
+        logger.debug("频道名称清洗: '%s' -> '%s'", name, cleaned_name)
     
-    # 第二十一步：处理频道名字不完整
-    # "黑龙江视"修正为"黑龙江卫视"（第一次需求中的规则9）
-    name = re.sub(r'黑龙江视', '黑龙江卫视', name)
+    return cleaned_name
+
+def log_rule_summary(top=10):
+    """按命中次数输出清洗规则的汇总（DEBUG 级别输出全部规则）"""
+    with _rule_hits_lock:
+        ranked = _rule_hits.most_common()
+    if not ranked:
+        return
+    logger.info(f"频道名称清洗规则命中（共 {len(ranked)} 条规则，{sum(count for _, count in ranked)} 次修改）:")
+    shown = ranked if logger.isEnabledFor(logging.DEBUG) else ranked[:top]
+    for label, count in shown:
+        logger.info(f"  {count:>6}  {label}")
+
+def setup_logging(level=None):
+    """配置日志输出（只输出消息本身，与原来的 print 输出格式一致）"""
+    logging.basicConfig(level=level or LOG_LEVEL, format="%(message)s", stream=sys.stdout)
+
+def write_text_atomic(path, text):
+    """先写入同目录下的临时文件再替换目标文件，读取方不会看到写了一半的内容"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def write_bytes_atomic(path, data):
+    """write_text_atomic 的二进制版本"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+class StageStats:
+    """单个直播源（或全局）的阶段耗时和计数器"""
+
+    def __init__(self):
+        self.status = None
+        self.stages = defaultdict(float)
+        self.counters = defaultdict(int)
+
+    def to_dict(self):
+        return {
+            "status": self.status,
+            "stages": {stage: round(seconds, 4) for stage, seconds in self.stages.items()},
+            "counters": dict(self.counters),
+        }
+
+class RunReport:
+    """一次运行的统计报告：各直播源的阶段耗时、请求明细、缓存命中率和频道数量
     
-    # 新增："内蒙古视"修正为"内蒙古卫视"
-    name = re.sub(r'内蒙古视', '内蒙古卫视', name)
+    统计归属于当前线程正在处理的直播源（见 source()），不在任何直播源中时归入全局统计
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.global_stats = StageStats()
+        self.sources = {}
+        self.requests = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def source(self, output_filename):
+        """在当前线程中标记正在处理的直播源"""
+        stats = StageStats()
+        with self._lock:
+            self.sources[output_filename] = stats
+        self._local.stats = stats
+        start = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            stats.stages["total"] += time.perf_counter() - start
+            self._local.stats = None
+
+    @property
+    def current(self):
+        return getattr(self._local, "stats", None) or self.global_stats
+
+    @contextmanager
+    def stage(self, name):
+        """累计当前直播源在某个阶段的耗时"""
+        stats = self.current
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats.stages[name] += time.perf_counter() - start
+
+    def add_time(self, name, seconds):
+        self.current.stages[name] += seconds
+
+    def count(self, name, value=1):
+        self.current.counters[name] += value
+
+    def record_request(self, url, description, seconds, status, size, cache=None):
+        """记录一次HTTP请求（cache 为 "fresh"/"304" 表示使用了磁盘缓存）"""
+        stats = self.current
+        stats.counters["requests"] += 1
+        stats.counters["bytes_downloaded"] += size if cache is None else 0
+        with self._lock:
+            self.requests.append({
+                "url": url,
+                "description": description,
+                "seconds": round(seconds, 4),
+                "status": status,
+                "bytes": size,
+                "cache": cache,
+            })
+
+    def to_dict(self, **extra):
+        def hit_rate(hits, misses):
+            total = hits + misses
+            return round(hits / total, 4) if total else None
+
+        response_hits = sum(1 for request in self.requests if request["cache"])
+        response_total = sum(1 for request in self.requests if request["status"] is not None)
+        slowest = max(self.sources.items(), key=lambda item: item[1].stages.get("total", 0), default=(None, None))[0]
+        return {
+            "started_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started_at)),
+            "duration_seconds": round(time.time() - self.started_at, 3),
+            "ruleset_version": RULESET_VERSION,
+            **extra,
+            "slowest_source": slowest,
+            "global": self.global_stats.to_dict(),
+            "sources": {name: stats.to_dict() for name, stats in self.sources.items()},
+            "caches": {
+                "clean_name": {"hits": _clean_name_cache.hits, "misses": _clean_name_cache.misses,
+                               "hit_rate": hit_rate(_clean_name_cache.hits, _clean_name_cache.misses)},
+                "normalize_name": {"hits": _normalize_name_cache.hits, "misses": _normalize_name_cache.misses,
+                                   "hit_rate": hit_rate(_normalize_name_cache.hits, _normalize_name_cache.misses)},
+                "response": {"hits": response_hits, "requests": response_total,
+                             "hit_rate": hit_rate(response_hits, response_total - response_hits)},
+            },
+            "rules": dict(_rule_hits.most_common()),
+            "requests": self.requests,
+        }
+
+    def save(self, path, **extra):
+        try:
+            write_text_atomic(path, json.dumps(self.to_dict(**extra), ensure_ascii=False, indent=2))
+        except Exception as e:
+            logger.warning(f"写入运行报告失败: {e}")
+            return False
+        logger.info(f"运行报告已写入: {path}")
+        return True
+
+# 当前运行的统计报告
+run_report = RunReport()
+
+def _import_optional(module_name, package=None):
+    """按需导入较重的依赖（chardet），缺少时给出安装提示；DEBUG 级别输出导入耗时"""
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+    start = time.perf_counter()
+    try:
+        module = importlib.import_module(module_name)
+    except ImportError:
+        package = package or module_name
+        logger.error(f"请先安装{package}库: pip install {package}")
+        raise
+    logger.debug(f"按需加载 {module_name}: {(time.perf_counter() - start) * 1000:.1f}ms")
+    return module
+
+def load_name_cache(cache_path):
+    """从磁盘加载频道名称缓存，版本不一致时丢弃整个缓存"""
+    if not cache_path or not os.path.exists(cache_path):
+        return False
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception as e:
+        logger.warning(f"读取频道名称缓存失败: {e}")
+        return False
     
-    # 去除首尾空格
-    name = name.strip()
+    if data.get("ruleset_version") == RULESET_VERSION:
+        _clean_name_cache.update(data.get("clean", {}))
+    if data.get("normalize_version") == channel_names.fingerprint():
+        _normalize_name_cache.update(data.get("normalize", {}))
+    logger.info(f"已加载频道名称缓存: 清洗 {len(_clean_name_cache)} 条, 标准化 {len(_normalize_name_cache)} 条")
+    return True
+
+def save_name_cache(cache_path):
+    """将频道名称缓存写入磁盘（先写临时文件再替换，避免写坏缓存）"""
+    if not cache_path:
+        return False
+    data = {
+        "ruleset_version": RULESET_VERSION,
+        "normalize_version": channel_names.fingerprint(),
+        "clean": _clean_name_cache.to_dict(),
+        "normalize": _normalize_name_cache.to_dict(),
+    }
+    try:
+        write_text_atomic(cache_path, json.dumps(data, ensure_ascii=False))
+    except Exception as e:
+        logger.warning(f"写入频道名称缓存失败: {e}")
+        return False
+    return True
+
+_host_semaphores = {}
+_host_semaphores_lock = threading.Lock()
+
+def host_slot(url):
+    """返回URL所在主机的信号量，用于限制同一主机的并发请求数"""
+    host = urlsplit(url).netloc
+    with _host_semaphores_lock:
+        semaphore = _host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(MAX_REQUESTS_PER_HOST)
+            _host_semaphores[host] = semaphore
+    return semaphore
+
+def _create_session():
+    """创建带连接池的共享会话，复用同一主机的TCP/TLS连接"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=max(MAX_WORKERS * MAX_REQUESTS_PER_HOST, 10))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+_session = _create_session()
+
+class ResponseCache:
+    """HTTP响应的磁盘缓存
     
-    if name != original_name:
-        print(f"频道名称清洗: '{original_name}' -> '{name}'")
+    保存响应内容及其ETag/Last-Modified，下次请求时发送If-None-Match/If-Modified-Since，
+    服务器返回304时直接使用磁盘副本；缓存总大小超过上限时淘汰最久未使用的条目
+    """
+
+    def __init__(self, cache_dir, ttl=0, max_bytes=200 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json"), os.path.join(self.cache_dir, f"{key}.body")
+
+    def get(self, url):
+        """返回缓存条目（包含body字节），不存在或已损坏时返回None"""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            with open(body_path, "rb") as f:
+                entry["body"] = f.read()
+        except (OSError, ValueError):
+            return None
+        if entry.get("url") != url:
+            return None
+        return entry
+
+    def is_fresh(self, entry):
+        """条目是否仍在有效期内（有效期内无需请求服务器）"""
+        return self.ttl > 0 and time.time() - entry.get("stored_at", 0) < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry):
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, url, response):
+        """保存响应；没有校验信息且未启用有效期时不缓存"""
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified and self.ttl <= 0:
+            return
+        meta = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "stored_at": time.time(),
+            "size": len(response.content),
+        }
+        self._write(url, meta, response.content)
+        self._evict()
+
+    def refresh(self, url, entry):
+        """服务器返回304后更新条目的保存时间"""
+        meta = {key: value for key, value in entry.items() if key != "body"}
+        meta["stored_at"] = time.time()
+        self._write(url, meta, None)
+        self._evict()
+
+    def _write(self, url, meta, body):
+        meta_path, body_path = self._paths(url)
+        with self._lock:
+            try:
+                if body is not None:
+                    with open(f"{body_path}.tmp", "wb") as f:
+                        f.write(body)
+                    os.replace(f"{body_path}.tmp", body_path)
+                else:
+                    os.utime(body_path)
+                with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+                    json.dump(meta, f, ensure_ascii=False)
+                os.replace(f"{meta_path}.tmp", meta_path)
+            except OSError as e:
+                logger.warning(f"写入响应缓存失败: {e}")
+
+    def _evict(self):
+        """缓存总大小超过上限时，按最近使用时间从旧到新删除条目"""
+        with self._lock:
+            bodies = []
+            for filename in os.listdir(self.cache_dir):
+                if filename.endswith(".body"):
+                    path = os.path.join(self.cache_dir, filename)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    bodies.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in bodies)
+            for _, size, path in sorted(bodies):
+                if total <= self.max_bytes:
+                    break
+                for stale_path in (path, path[:-len(".body")] + ".json"):
+                    try:
+                        os.remove(stale_path)
+                    except OSError:
+                        pass
+                total -= size
+
+_response_cache = ResponseCache(
+    os.path.join(CACHE_DIR, "responses"),
+    ttl=RESPONSE_CACHE_TTL,
+    max_bytes=RESPONSE_CACHE_MAX_MB * 1024 * 1024,
+) if CACHE_DIR else None
+
+def download_bytes(url, headers, timeout=15, description="数据"):
+    """下载URL内容（字节），优先使用磁盘缓存和条件请求"""
+    cached = _response_cache.get(url) if _response_cache else None
+    if cached is not None and _response_cache.is_fresh(cached):
+        logger.info(f"使用缓存的{description}（有效期内）")
+        run_report.record_request(url, description, 0.0, None, len(cached["body"]), cache="fresh")
+        return cached["body"]
+    
+    request_headers = dict(headers)
+    if cached is not None:
+        request_headers.update(ResponseCache.conditional_headers(cached))
+    
+    start = time.perf_counter()
+    try:
+        with host_slot(url):
+            response = _session.get(url, headers=request_headers, timeout=timeout)
+    except requests.exceptions.RequestException:
+        run_report.record_request(url, description, time.perf_counter() - start, "error", 0)
+        raise
+    elapsed = time.perf_counter() - start
+    
+    if response.status_code == 304 and cached is not None:
+        logger.info(f"{description}未变化，使用缓存 (304)")
+        run_report.record_request(url, description, elapsed, 304, len(cached["body"]), cache="304")
+        _response_cache.refresh(url, cached)
+        return cached["body"]
+    
+    run_report.record_request(url, description, elapsed, response.status_code, len(response.content))
+    response.raise_for_status()
+    if _response_cache:
+        _response_cache.put(url, response)
+    return response.content
+
+# 解码结果中应至少包含其中一个关键字，用于判断编码是否正确
+_CONTENT_KEYWORDS = ['CCTV', '卫视', 'http', '#genre#']
+
+# 字节顺序标记（BOM）及对应编码，UTF-32需在UTF-16之前判断
+_BOM_ENCODINGS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+# 编码检测只使用内容开头的样本，避免对整个大文件运行chardet
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
+# 每个URL上次成功使用的编码（下次优先尝试）
+_source_encodings = {}
+
+def _looks_like_channel_list(text):
+    return any(keyword in text for keyword in _CONTENT_KEYWORDS)
+
+def _try_decode(content_bytes, enc):
+    """使用指定编码解码并校验内容，失败返回None"""
+    try:
+        decoded_content = content_bytes.decode(enc)
+    except (UnicodeDecodeError, LookupError):
+        return None
+    return decoded_content if _looks_like_channel_list(decoded_content) else None
+
+def decode_content(content_bytes, url, description="数据", encoding=None):
+    """将下载的字节解码为文本
     
-    return name
+    依次尝试：指定编码 -> 该URL上次成功的编码 -> BOM -> 严格UTF-8 -> 样本检测 -> 常见中文编码
+    """
+    # 首先尝试使用指定的编码
+    if encoding:
+        try:
+            return content_bytes.decode(encoding)
+        except UnicodeDecodeError:
+            logger.warning(f"使用指定编码 {encoding} 解码 {description} 失败，尝试自动检测")
+    
+    # 上次成功使用的编码
+    remembered = _source_encodings.get(url)
+    if remembered:
+        decoded_content = _try_decode(content_bytes, remembered)
+        if decoded_content is not None:
+            return decoded_content
+        logger.warning(f"使用上次的编码 {remembered} 解码 {description} 失败，重新检测")
+    
+    candidates = []
+    for bom, enc in _BOM_ENCODINGS:
+        if content_bytes.startswith(bom):
+            candidates.append(enc)
+            break
+    candidates.append('utf-8')
+    
+    # 对于tv12和tv1288源，尝试多种编码
+    if "tv12.xyz" in url or "tv1288.xyz" in url:
+        candidates.extend(['gbk', 'gb2312', 'gb18030', 'big5', 'latin-1', 'iso-8859-1'])
+    
+    for enc in candidates:
+        decoded_content = _try_decode(content_bytes, enc)
+        if decoded_content is not None:
+            _source_encodings[url] = enc
+            return decoded_content
+    
+    # 对内容样本进行编码检测
+    detected = _import_optional("chardet").detect(content_bytes[:ENCODING_SAMPLE_SIZE])
+    if detected['encoding'] and detected['confidence'] > 0.6:  # 降低置信度阈值
+        decoded_content = _try_decode(content_bytes, detected['encoding'])
+        if decoded_content is not None:
+            logger.info(f"使用检测到的编码 {detected['encoding']} 解码 {description} (置信度: {detected['confidence']:.2f})")
+            _source_encodings[url] = detected['encoding']
+            return decoded_content
+        logger.warning(f"使用检测到的编码 {detected['encoding']} 解码 {description} 失败，尝试其他编码")
+    
+    # 尝试常见的中文编码
+    for enc in ['gbk', 'gb2312', 'gb18030', 'big5', 'latin-1']:
+        decoded_content = _try_decode(content_bytes, enc)
+        if decoded_content is not None:
+            logger.info(f"成功使用编码 {enc} 解码 {description}")
+            _source_encodings[url] = enc
+            return decoded_content
+    
+    # 如果所有尝试都失败，返回原始字节的字符串表示（用于调试）
+    logger.warning(f"{description} 的所有编码尝试失败，返回原始内容的前1000字符用于调试")
+    return str(content_bytes[:1000])
+
+def load_source_encodings(cache_path):
+    """从磁盘加载各URL上次成功使用的编码"""
+    if not cache_path or not os.path.exists(cache_path):
+        return False
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            _source_encodings.update(json.load(f))
+    except Exception as e:
+        logger.warning(f"读取编码记录失败: {e}")
+        return False
+    return True
+
+def save_source_encodings(cache_path):
+    """将各URL成功使用的编码写入磁盘"""
+    if not cache_path:
+        return False
+    try:
+        write_text_atomic(cache_path, json.dumps(_source_encodings, ensure_ascii=False, indent=2))
+    except Exception as e:
+        logger.warning(f"写入编码记录失败: {e}")
+        return False
+    return True
+
+_DOMAIN_PATTERN = re.compile(r'https?://([^/]+)')
 
 def fetch_url(url, description="数据", encoding=None, referer=None, user_agent=None, max_retries=3):
     """通用URL请求函数"""
@@ -399,7 +1080,7 @@ def fetch_url(url, description="数据", encoding=None, referer=None, user_agent
     else:
         # 如果没有提供 Referer，使用 URL 的域名作为默认 Referer
         try:
-            domain = re.search(r'https?://([^/]+)', url).group(1)
+            domain = _DOMAIN_PATTERN.search(url).group(1)
             headers["Referer"] = f"https://{domain}/"
         except:
             pass
@@ -424,74 +1105,28 @@ def fetch_url(url, description="数据", encoding=None, referer=None, user_agent
                 }
                 headers.update(browser_headers)
             
-            response = requests.get(url, headers=headers, timeout=15)
-            response.raise_for_status()
-            
             # 获取原始字节数据
-            content_bytes = response.content
-            
-            # 首先尝试使用指定的编码
-            if encoding:
-                try:
-                    return content_bytes.decode(encoding)
-                except UnicodeDecodeError:
-                    print(f"使用指定编码 {encoding} 解码失败，尝试自动检测")
-            
-            # 对于tv12和tv1288源，尝试多种编码
-            if "tv12.xyz" in url or "tv1288.xyz" in url:
-                encodings_to_try = ['utf-8', 'gbk', 'gb2312', 'gb18030', 'big5', 'latin-1', 'iso-8859-1']
-                for enc in encodings_to_try:
-                    try:
-                        decoded_content = content_bytes.decode(enc)
-                        # 检查解码后的内容是否包含可读字符
-                        if any(keyword in decoded_content for keyword in ['CCTV', '卫视', 'http', '#genre#']):
-                            print(f"成功使用编码 {enc} 解码 {description}")
-                            return decoded_content
-                    except UnicodeDecodeError:
-                        continue
-            
-            # 尝试自动检测编码
-            detected = chardet.detect(content_bytes)
-            if detected['confidence'] > 0.6:  # 降低置信度阈值
-                try:
-                    decoded_content = content_bytes.decode(detected['encoding'])
-                    # 验证解码结果
-                    if any(keyword in decoded_content for keyword in ['CCTV', '卫视', 'http', '#genre#']):
-                        print(f"使用检测到的编码 {detected['encoding']} (置信度: {detected['confidence']:.2f})")
-                        return decoded_content
-                except UnicodeDecodeError:
-                    print(f"使用检测到的编码 {detected['encoding']} 解码失败，尝试其他编码")
-            
-            # 尝试常见的中文编码
-            encodings_to_try = ['utf-8', 'gbk', 'gb2312', 'gb18030', 'big5', 'latin-1']
+            with run_report.stage("fetch"):
+                content_bytes = download_bytes(url, headers, timeout=15, description=description)
             
-            for enc in encodings_to_try:
-                try:
-                    decoded_content = content_bytes.decode(enc)
-                    # 验证解码结果是否包含预期的内容
-                    if any(keyword in decoded_content for keyword in ['CCTV', '卫视', 'http', '#genre#']):
-                        print(f"成功使用编码 {enc} 解码 {description}")
-                        return decoded_content
-                except UnicodeDecodeError:
-                    continue
-            
-            # 如果所有尝试都失败，返回原始字节的字符串表示（用于调试）
-            print(f"所有编码尝试失败，返回原始内容的前1000字符用于调试")
-            return str(content_bytes[:1000])
+            with run_report.stage("decode"):
+                return decode_content(content_bytes, url, description, encoding)
                 
         except requests.exceptions.RequestException as e:
             if attempt < max_retries - 1:
                 wait_time = (2 ** attempt) + random.random()  # 指数退避策略
-                print(f"获取{description}失败 (尝试 {attempt + 1}/{max_retries}): {e}. 等待 {wait_time:.2f} 秒后重试...")
-                time.sleep(wait_time)
+                logger.warning(f"获取{description}失败 (尝试 {attempt + 1}/{max_retries}): {e}. 等待 {wait_time:.2f} 秒后重试...")
+                run_report.count("retries")
+                with run_report.stage("retry_wait"):
+                    time.sleep(wait_time)
                 
                 # 每次重试时更换 User-Agent
                 headers["User-Agent"] = random.choice(BROWSER_USER_AGENTS)
             else:
-                print(f"获取{description}失败: {e}")
+                logger.warning(f"获取{description}失败: {e}")
                 return None
         except Exception as e:
-            print(f"获取{description}失败: {e}")
+            logger.warning(f"获取{description}失败: {e}")
             return None
     
     return None
@@ -511,12 +1146,281 @@ def fix_unicode_escape(text):
     
     return text
 
+def normalize_channel_names(names):
+    """批量标准化频道名称（转简体并小写），返回与输入顺序一致的列表"""
+    results = [""] * len(names)
+    pending = {}
+    for i, name in enumerate(names):
+        if not name:
+            continue
+        norm_name = _normalize_name_cache.get(name)
+        if norm_name is None:
+            pending.setdefault(name, []).append(i)
+        else:
+            results[i] = norm_name
+    
+    if pending:
+        raw_names = list(pending)
+        # 只做简繁转换和小写，不进行清洗
+        norm_names = channel_names.convert_names_to_simplified([name.lower() for name in raw_names])
+        for name, norm_name in zip(raw_names, norm_names):
+            _normalize_name_cache.put(name, norm_name)
+            for i in pending[name]:
+                results[i] = norm_name
+    return results
+
 def normalize_channel_name(name):
     """标准化频道名称（转简体并小写）"""
     if not name:
         return ""
-    # 只做简繁转换和小写，不进行清洗
-    return convert(name.lower(), 'zh-cn')
+    return normalize_channel_names([name])[0]
+
+# 去掉末尾的4k、8k和16k相关字样（按顺序执行）
+_RESOLUTION_SUFFIX_PATTERNS = [
+    re.compile(r'\s*-\s*4k\s*$', re.IGNORECASE),
+    re.compile(r'\s*4k\s*$', re.IGNORECASE),
+    re.compile(r'\s*-\s*8k\s*$', re.IGNORECASE),
+    re.compile(r'\s*8k\s*$', re.IGNORECASE),
+    re.compile(r'\s*-\s*16k\s*$', re.IGNORECASE),
+    re.compile(r'\s*16k\s*$', re.IGNORECASE),
+]
+
+def strip_resolution_suffix(norm_name):
+    """去掉标准化名称末尾的4K、8K和16K相关字样（只用于EPG匹配）"""
+    for pattern in _RESOLUTION_SUFFIX_PATTERNS:
+        norm_name = pattern.sub('', norm_name)
+    return norm_name
+
+_FUZZY_KEY_PATTERN = re.compile(r'[\W_]+')
+_DIGITS_PATTERN = re.compile(r'\d+')
+
+def _fuzzy_key(norm_name):
+    """模糊匹配使用的名称：去掉空白、标点和符号，只保留文字和数字"""
+    return _FUZZY_KEY_PATTERN.sub('', norm_name)
+
+def _char_bigrams(key):
+    if len(key) < 2:
+        return frozenset((key,))
+    return frozenset(key[i:i + 2] for i in range(len(key) - 1))
+
+class FuzzyEpgMatcher:
+    """基于字符二元组倒排索引的EPG模糊匹配（精确匹配失败时的后备）
+    
+    候选只从与名称共享某个二元组的EPG频道中产生（跳过出现在大量频道中的常见二元组，如"卫视"），
+    不需要扫描整个EPG列表；候选按二元组集合的Dice系数打分，名称中的数字必须完全一致
+    （避免CCTV1匹配到CCTV11），且开头两个字相同或一个名称包含另一个；得分不低于阈值的最高分候选即为结果，
+    同分时取EPG列表中靠前的频道
+    """
+
+    def __init__(self, epg_index, threshold):
+        self.threshold = threshold
+        self._exact = {}
+        self._entries = []
+        self._postings = defaultdict(list)
+        for epg_norm_name, epg_channel in epg_index.items():
+            key = _fuzzy_key(epg_norm_name)
+            if not key or key in self._exact:
+                continue
+            self._exact[key] = epg_channel
+            grams = _char_bigrams(key)
+            entry_id = len(self._entries)
+            self._entries.append((key, grams, tuple(_DIGITS_PATTERN.findall(key)), epg_channel))
+            for gram in grams:
+                self._postings[gram].append(entry_id)
+        # 出现在过多频道中的二元组不用于产生候选
+        self.max_posting = max(64, len(self._entries) // 20)
+        self._init_state()
+
+    def _init_state(self):
+        self._cache = LRUCache(NAME_CACHE_SIZE)
+        self._matches = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # 缓存和锁不随对象传给子进程
+        state = self.__dict__.copy()
+        for name in ("_cache", "_matches", "_lock"):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_state()
+
+    def match(self, norm_name):
+        """返回 (EPG频道, 置信度)，没有达到阈值的候选时返回 (None, 0.0)"""
+        key = _fuzzy_key(norm_name)
+        if not key:
+            return None, 0.0
+        result = self._cache.get(key)
+        if result is None:
+            result = self._match_key(key)
+            self._cache.put(key, result)
+            if result[0] is not None:
+                with self._lock:
+                    self._matches[norm_name] = {"tvg_name": result[0]["channel_name"], "confidence": result[1]}
+                logger.debug("EPG模糊匹配: '%s' -> '%s' (置信度 %.2f)", norm_name, result[0]["channel_name"], result[1])
+        return result
+
+    def _match_key(self, key):
+        exact = self._exact.get(key)
+        if exact is not None:
+            return exact, 1.0
+        
+        grams = _char_bigrams(key)
+        shared = defaultdict(int)
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is not None and len(posting) <= self.max_posting:
+                for entry_id in posting:
+                    shared[entry_id] += 1
+        
+        digits = tuple(_DIGITS_PATTERN.findall(key))
+        best_channel, best_score, best_id = None, 0.0, None
+        for entry_id in shared:
+            entry_key, entry_grams, entry_digits, epg_channel = self._entries[entry_id]
+            if entry_digits != digits:
+                continue
+            # 开头不同且互不包含的名称通常是不同地区的同类频道（如"绍兴新闻综合"和"宜兴新闻综合"）
+            if key[:2] != entry_key[:2] and key not in entry_key and entry_key not in key:
+                continue
+            score = 2 * len(grams & entry_grams) / (len(grams) + len(entry_grams))
+            if score > best_score or (score == best_score and best_id is not None and entry_id < best_id):
+                best_channel, best_score, best_id = epg_channel, score, entry_id
+        if best_score < self.threshold:
+            return None, 0.0
+        return best_channel, round(best_score, 4)
+
+    def clear_cache(self):
+        self._cache = LRUCache(NAME_CACHE_SIZE)
+
+    def drain_matches(self):
+        """取出并清空已记录的模糊匹配 {标准化名称: {"tvg_name", "confidence"}}"""
+        with self._lock:
+            matches, self._matches = self._matches, {}
+        return matches
+
+    def record_matches(self, matches):
+        with self._lock:
+            self._matches.update(matches)
+
+    @property
+    def matches(self):
+        with self._lock:
+            return dict(self._matches)
+
+class EpgIndex(dict):
+    """EPG匹配索引（去掉分辨率后缀的标准化名称 -> EPG频道），可附带模糊匹配后备"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fuzzy = None
+
+def build_epg_index(epg_channels, fuzzy_threshold=0):
+    """构建EPG匹配索引：去掉分辨率后缀的标准化名称 -> EPG频道
+    
+    同名时保留列表中靠前的频道，与按顺序查找第一个匹配的结果一致；
+    fuzzy_threshold 大于0时同时构建模糊匹配索引
+    """
+    epg_index = EpgIndex()
+    norm_names = normalize_channel_names([epg_channel["channel_name"] for epg_channel in epg_channels])
+    for epg_channel, norm_name in zip(epg_channels, norm_names):
+        epg_index.setdefault(strip_resolution_suffix(norm_name), epg_channel)
+    if fuzzy_threshold > 0:
+        epg_index.fuzzy = FuzzyEpgMatcher(epg_index, fuzzy_threshold)
+    return epg_index
+
+def parse_logo_data(logo_data):
+    """解析Logo数据（logo.json格式），返回 标准化名称 -> Logo URL 的映射"""
+    logos = json.loads(logo_data)
+    logo_map = {}
+    norm_names = normalize_channel_names([logo["logo_name"] for logo in logos])
+    for logo, norm_name in zip(logos, norm_names):
+        logo_map[norm_name] = logo["logo_url"]
+    return logo_map
+
+def build_logo_index(logo_maps):
+    """将按优先级排列的多个Logo映射合并为一个：同名时保留优先级最高（靠前）的映射中的Logo"""
+    logo_index = {}
+    for logo_map in logo_maps:
+        for norm_name, logo_url in logo_map.items():
+            logo_index.setdefault(norm_name, logo_url)
+    return logo_index
+
+# Logo索引文件格式：魔数 + 输入摘要（sha256） + zlib压缩的 "名称\0URL\0名称\0URL..." 
+_LOGO_INDEX_MAGIC = b"M3ULOGO1"
+
+def logo_inputs_digest(logo_datas):
+    """Logo索引的输入摘要：各Logo数据的原始内容及简繁转换的版本"""
+    digest = hashlib.sha256(channel_names.fingerprint().encode("utf-8"))
+    for logo_data in logo_datas:
+        digest.update(b"\1" if logo_data is None else b"\0" + logo_data.encode("utf-8"))
+        digest.update(b"\2")
+    return digest.digest()
+
+def save_logo_index(path, digest, logo_index):
+    if not path:
+        return False
+    payload = "\0".join(part for item in logo_index.items() for part in item).encode("utf-8")
+    try:
+        write_bytes_atomic(path, _LOGO_INDEX_MAGIC + digest + zlib.compress(payload, 6))
+    except Exception as e:
+        logger.warning(f"写入Logo索引失败: {e}")
+        return False
+    return True
+
+def load_logo_index(path, digest):
+    """读取持久化的Logo索引，文件不存在或输入摘要不一致时返回None"""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        header_size = len(_LOGO_INDEX_MAGIC) + len(digest)
+        if data[:len(_LOGO_INDEX_MAGIC)] != _LOGO_INDEX_MAGIC or data[len(_LOGO_INDEX_MAGIC):header_size] != digest:
+            return None
+        payload = zlib.decompress(data[header_size:]).decode("utf-8")
+    except Exception as e:
+        logger.warning(f"读取Logo索引失败: {e}")
+        return None
+    if not payload:
+        return {}
+    parts = iter(payload.split("\0"))
+    return dict(zip(parts, parts))
+
+def load_logos(logo_urls, index_path=None):
+    """获取所有Logo数据并构建合并的Logo索引，返回 (Logo索引, 各Logo数据原始内容)
+    
+    Logo数据未变化时直接读取持久化的索引（index_path），跳过解析和名称标准化
+    """
+    # 各Logo数据并发下载，结果保持配置中的顺序（即优先级）
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_WORKERS, len(logo_urls)))) as executor:
+        logo_datas = list(executor.map(lambda logo_url: fetch_url(logo_url, f"Logo数据({logo_url})"), logo_urls))
+    digest = logo_inputs_digest(logo_datas)
+    
+    logo_index = load_logo_index(index_path, digest)
+    if logo_index is not None:
+        logger.info(f"Logo数据未变化，使用缓存的Logo索引 (包含 {len(logo_index)} 个Logo)")
+        return logo_index, logo_datas
+    
+    logo_maps = []
+    for logo_url, logo_data in zip(logo_urls, logo_datas):
+        if not logo_data:
+            continue
+        try:
+            logo_map = parse_logo_data(logo_data)
+        except Exception as e:
+            logger.warning(f"解析Logo数据失败: {logo_url}, 错误: {e}")
+            continue
+        logo_maps.append(logo_map)
+        logger.info(f"成功加载Logo数据: {logo_url} (包含 {len(logo_map)} 个Logo)")
+    
+    logo_index = build_logo_index(logo_maps)
+    save_logo_index(index_path, digest, logo_index)
+    return logo_index, logo_datas
+
+_VALID_GENRE_LINE_PATTERN = re.compile(r",#?\w*genre\w*#?$")
+_VALID_CHANNEL_LINE_PATTERN = re.compile(r'^[^,]+,[^,]+$')
 
 def is_valid_m3u_line(line):
     """检查是否为有效的M3U格式行"""
@@ -525,17 +1429,688 @@ def is_valid_m3u_line(line):
         return False
     
     # 有效的行应该包含逗号分隔的频道名称和URL，或者是分组行
-    if line.endswith(",#genre#") or line.endswith(",genre") or re.search(r",#?\w*genre\w*#?$", line):
+    if line.endswith(",#genre#") or line.endswith(",genre") or _VALID_GENRE_LINE_PATTERN.search(line):
         return True
     
     # 检查是否是频道行（名称,URL格式）
-    if re.search(r'^[^,]+,[^,]+$', line):
+    if _VALID_CHANNEL_LINE_PATTERN.search(line):
         return True
     
     return False
 
-def process_single_source(output_filename, source_config, epg_channels, logo_sources):
-    """处理单个直播源"""
+# 行结束符（与str.splitlines一致），以\r结尾的块可能还有后续的\n，需要等待下一块
+_LINE_BREAKS = "\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029"
+
+def iter_text_lines(chunks, chunk_size=64 * 1024):
+    """将文本块逐行切分，切分结果与对完整文本调用splitlines()一致
+    
+    chunks 可以是完整字符串（按块切分后处理，不生成整份行列表），
+    也可以是增量解码得到的文本块序列
+    """
+    if isinstance(chunks, str):
+        text = chunks
+        chunks = (text[i:i + chunk_size] for i in range(0, len(text), chunk_size))
+    
+    pending = ""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        pending += chunk
+        pieces = pending.splitlines(keepends=True)
+        last_piece = pieces[-1]
+        if last_piece[-1] not in _LINE_BREAKS or last_piece[-1] == "\r":
+            pending = pieces.pop()
+        else:
+            pending = ""
+        for piece in pieces:
+            yield piece.splitlines()[0]
+    
+    if pending:
+        yield from pending.splitlines()
+
+_GENRE_PATTERN = re.compile(r'^(.*?),(#genre#|genre)(?:,.*)?$', re.IGNORECASE)
+_SUPPORTED_PROTOCOL_PATTERN = re.compile(r'^(http|https|rtmp|rtsp|mms|p3p|P2p|p2p|mitv)://', re.IGNORECASE)
+
+def iter_batches(iterable, size):
+    """将可迭代对象按固定大小分批产出列表"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+class ChannelListParser:
+    """txt/#genre# 列表格式的单遍解析器
+    
+    逐行读取，每行只分类一次（分组行、频道行或无效行），解析的同时统计数据质量，
+    并逐个产出频道记录（Channel，名称为未清洗的原始名称）
+    """
+
+    def __init__(self):
+        self.total_lines = 0
+        self.valid_lines = 0
+        self.skipped_lines = 0
+        self.group_lines = 0
+        self.unsupported_lines = 0
+
+    @property
+    def valid_ratio(self):
+        return self.valid_lines / self.total_lines if self.total_lines else 0
+
+    def parse(self, lines):
+        current_group = "默认分组"
+        
+        for line in lines:
+            self.total_lines += 1
+            line_count = self.total_lines
+            if is_valid_m3u_line(line):
+                self.valid_lines += 1
+            line = line.strip()
+            
+            # 跳过空行
+            if not line:
+                continue
+            
+            # ========== 修改开始：支持分组行带额外参数（如 ,DE=3） ==========
+            # 检查是否是分组行 (支持多种格式，包括末尾带额外参数如",DE=3")
+            # 匹配模式: 任意内容 + 逗号 + #genre# 或 genre + 可选的逗号和额外参数
+            genre_match = _GENRE_PATTERN.search(line)
+            if genre_match:
+                current_group = genre_match.group(1).strip()
+                # 尝试修复Unicode转义序列
+                current_group = fix_unicode_escape(current_group)
+                self.group_lines += 1
+                logger.debug("检测到分组: %s (第%d行)", current_group, line_count)
+                continue
+            # ========== 修改结束 ==========
+            
+            # 解析频道行 - 尝试多种分隔符
+            parts = None
+            separators = [",", " ", "\t"]
+            
+            for sep in separators:
+                if sep in line:
+                    parts = line.split(sep, 1)
+                    if len(parts) >= 2:
+                        break
+            
+            if not parts or len(parts) < 2:
+                self.skipped_lines += 1
+                if self.skipped_lines <= 3:  # 只显示前3个解析失败的例子
+                    # 显示行的前50个字符，避免输出过长
+                    display_line = line[:50] + "..." if len(line) > 50 else line
+                    logger.warning("警告: 无法解析第%d行: %s", line_count, display_line)
+                continue
+            
+            channel_name, channel_url = parts
+            channel_name = channel_name.strip()
+            channel_url = channel_url.strip()
+            
+            # 尝试修复Unicode转义序列
+            channel_name = fix_unicode_escape(channel_name)
+            
+            # 跳过无效的频道行
+            if not channel_name or not channel_url:
+                self.skipped_lines += 1
+                continue
+            
+            # 检查URL是否以常见协议开头 - 添加p3p协议支持
+            if not _SUPPORTED_PROTOCOL_PATTERN.match(channel_url):
+                self.skipped_lines += 1
+                self.unsupported_lines += 1
+                if self.skipped_lines <= 5:  # 只显示前5个被跳过的URL例子
+                    logger.info("跳过不支持的协议: %s...", channel_url[:50])
+                continue
+            
+            yield Channel(current_group, channel_name, channel_url)
+
+def match_channel(norm_channel_name, epg_index, logo_index):
+    """按标准化名称匹配EPG和Logo信息，返回 (tvg_id, tvg_name, tvg_logo)"""
+    tvg_id = ""
+    tvg_name = ""
+    tvg_logo = ""
+    
+    # 为EPG匹配创建一个临时名称，去掉末尾的4K、8K和16K相关字样（只用于EPG匹配）
+    epg_norm_name = strip_resolution_suffix(norm_channel_name)
+    
+    # 通过索引查找（索引中保留的是EPG列表中第一个匹配的频道），找不到时使用模糊匹配
+    epg_channel = epg_index.get(epg_norm_name)
+    if epg_channel is None and getattr(epg_index, "fuzzy", None) is not None:
+        epg_channel, _ = epg_index.fuzzy.match(epg_norm_name)
+    if epg_channel:
+        tvg_id = epg_channel["channel_id"]
+        tvg_name = epg_channel["channel_name"]
+    
+    # 匹配Logo - 合并索引中保留的是按优先级第一个匹配的Logo（仍然使用原始norm_channel_name）
+    tvg_logo = logo_index.get(norm_channel_name, "")
+    
+    return tvg_id, tvg_name, tvg_logo
+
+def format_extinf(channel_name, group, tvg_id="", tvg_name="", tvg_logo=""):
+    """构建M3U条目的#EXTINF行"""
+    attr_parts = []
+    if tvg_id:
+        attr_parts.append(f'tvg-id="{tvg_id}"')
+    if tvg_name:
+        attr_parts.append(f'tvg-name="{tvg_name}"')
+    if tvg_logo:
+        attr_parts.append(f'tvg-logo="{tvg_logo}"')
+    if group:
+        attr_parts.append(f'group-title="{group}"')
+    
+    attrs = " ".join(attr_parts)
+    return f'#EXTINF:-1 {attrs},{channel_name}'
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+class Channel:
+    """一个频道条目，从解析到写入的各个阶段都传递同一个对象
+    
+    使用 __slots__ 减少每个频道的内存占用；分组和tvg属性在大量频道之间重复，
+    构造时驻留为同一个字符串对象（从子进程取回的频道也会重新驻留）
+    """
+
+    __slots__ = ("group", "name", "url", "tvg_id", "tvg_name", "tvg_logo")
+
+    def __init__(self, group, name, url, tvg_id="", tvg_name="", tvg_logo=""):
+        self.group = _intern(group)
+        self.name = name
+        self.url = url
+        self.tvg_id = _intern(tvg_id)
+        self.tvg_name = _intern(tvg_name)
+        self.tvg_logo = _intern(tvg_logo)
+
+    def __reduce__(self):
+        return Channel, (self.group, self.name, self.url, self.tvg_id, self.tvg_name, self.tvg_logo)
+
+    def __repr__(self):
+        return f"Channel({self.group!r}, {self.name!r}, {self.url!r})"
+
+    def set_match(self, tvg_id, tvg_name, tvg_logo):
+        self.tvg_id = _intern(tvg_id)
+        self.tvg_name = _intern(tvg_name)
+        self.tvg_logo = _intern(tvg_logo)
+
+    def with_url(self, url):
+        """同一频道的另一个URL"""
+        return Channel(self.group, self.name, url, self.tvg_id, self.tvg_name, self.tvg_logo)
+
+    def extinf(self):
+        return format_extinf(self.name, self.group, self.tvg_id, self.tvg_name, self.tvg_logo)
+
+_EXTINF_ATTR_PATTERN = re.compile(r'([\w-]+)="([^"]*)"')
+
+def parse_extinf(extinf_line, url):
+    """把本脚本生成的#EXTINF行和URL解析回 Channel（format_extinf 的逆操作）"""
+    attrs_part, _, channel_name = extinf_line.rpartition(",")
+    attrs = dict(_EXTINF_ATTR_PATTERN.findall(attrs_part))
+    return Channel(attrs.get("group-title", ""), channel_name, url,
+                   attrs.get("tvg-id", ""), attrs.get("tvg-name", ""), attrs.get("tvg-logo", ""))
+
+def write_m3u(path, channels, gzip_copy=None):
+    """流式写入M3U文件（#EXTM3U 头及每个频道的#EXTINF行和URL），返回写入的频道数
+    
+    频道可以是生成器，每 M3U_WRITE_CHUNK 个频道编码一次并写入，不需要先拼出整个文件；
+    gzip_copy（默认 WRITE_GZIP）为真时在同一遍写入中生成 path + ".gz"。
+    先写入临时文件再替换目标文件；没有频道时不修改已有文件。写入耗时计入运行报告的 write 阶段
+    """
+    if gzip_copy is None:
+        gzip_copy = WRITE_GZIP
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    gz_path = f"{path}.gz"
+    gz_tmp_path = f"{gz_path}.tmp"
+    
+    count = 0
+    write_seconds = 0.0
+    try:
+        with ExitStack() as stack:
+            f = stack.enter_context(open(tmp_path, "wb"))
+            gz = None
+            if gzip_copy:
+                gz_raw = stack.enter_context(open(gz_tmp_path, "wb"))
+                # mtime=0：内容不变时压缩文件也完全相同，不会产生多余的提交
+                gz = stack.enter_context(gzip.GzipFile(os.path.basename(path), "wb", GZIP_LEVEL, gz_raw, mtime=0))
+            
+            def write_chunk(text):
+                nonlocal write_seconds
+                start = time.perf_counter()
+                data = text.encode("utf-8")
+                f.write(data)
+                if gz is not None:
+                    gz.write(data)
+                write_seconds += time.perf_counter() - start
+            
+            lines = ["#EXTM3U"]
+            for channel in channels:
+                lines.append(channel.extinf())
+                lines.append(channel.url)
+                count += 1
+                if count % M3U_WRITE_CHUNK == 0:
+                    write_chunk("\n".join(lines))
+                    lines = [""]
+            if len(lines) > 1:
+                write_chunk("\n".join(lines))
+    except BaseException:
+        for tmp in (tmp_path, gz_tmp_path):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        raise
+    
+    if count == 0:
+        os.remove(tmp_path)
+        if gzip_copy:
+            os.remove(gz_tmp_path)
+        return 0
+    os.replace(tmp_path, path)
+    if gzip_copy:
+        os.replace(gz_tmp_path, gz_path)
+    run_report.add_time("write", write_seconds)
+    return count
+
+def _match_batch(batch, norm_names, epg_index, logo_index):
+    """匹配一批（已清洗的）频道的EPG和Logo信息，返回 (EPG匹配数, Logo匹配数)"""
+    epg_matched = 0
+    logo_matched = 0
+    for channel, norm_channel_name in zip(batch, norm_names):
+        tvg_id, tvg_name, tvg_logo = match_channel(norm_channel_name, epg_index, logo_index)
+        if tvg_id:
+            epg_matched += 1
+        if tvg_logo:
+            logo_matched += 1
+        channel.set_match(tvg_id, tvg_name, tvg_logo)
+    return epg_matched, logo_matched
+
+def _clean_batch(batch):
+    """清洗一批频道的名称，返回被修改的名称数"""
+    renamed = 0
+    for channel in batch:
+        cleaned_name = clean_channel_name(channel.name)
+        if cleaned_name != channel.name:
+            channel.name = cleaned_name
+            renamed += 1
+    return renamed
+
+# 子进程中的EPG索引和Logo索引（进程启动时传入一次，不随每批数据重复传输）
+_worker_indexes = None
+
+def _init_channel_worker(epg_index, logo_index):
+    global _worker_indexes
+    _worker_indexes = (epg_index, logo_index)
+
+def _convert_batch_in_worker(batch):
+    """在子进程中清洗、标准化并匹配一批频道，返回 (处理后的频道列表, 计数, 清洗规则命中, 新的EPG模糊匹配)"""
+    epg_index, logo_index = _worker_indexes
+    with _rule_hits_lock:
+        _rule_hits.clear()
+    renamed = _clean_batch(batch)
+    norm_names = normalize_channel_names([channel.name for channel in batch])
+    epg_matched, logo_matched = _match_batch(batch, norm_names, epg_index, logo_index)
+    counts = {"renamed": renamed, "epg_matched": epg_matched, "logo_matched": logo_matched}
+    with _rule_hits_lock:
+        rule_hits = dict(_rule_hits)
+    fuzzy_matches = epg_index.fuzzy.drain_matches() if getattr(epg_index, "fuzzy", None) is not None else {}
+    return batch, counts, rule_hits, fuzzy_matches
+
+class ChannelProcessPool:
+    """在多个进程中并行清洗、标准化和匹配频道
+    
+    EPG索引和Logo索引在每个子进程启动时传入一次；各批结果按提交顺序取回，
+    输出与单进程处理完全一致。所有直播源共用一个进程池，子进程使用各自的名称缓存
+    """
+
+    def __init__(self, epg_index, logo_index, workers):
+        self.epg_index = epg_index
+        self.logo_index = logo_index
+        self.workers = workers
+        # 使用spawn：主进程中有多个线程在运行，fork可能复制到被其他线程持有的锁
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_channel_worker,
+            initargs=(epg_index, logo_index),
+        )
+
+    def supports(self, epg_index, logo_index):
+        return epg_index is self.epg_index and logo_index is self.logo_index
+
+    def map_batches(self, batches):
+        """按原顺序逐批产出结果，同时最多有 workers*2 批在处理中，内存占用有上限"""
+        pending = deque()
+        for batch in batches:
+            pending.append(self._executor.submit(_convert_batch_in_worker, batch))
+            if len(pending) >= self.workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+def iter_channels(channels, epg_index, logo_index, batch_size=None, pool=None):
+    """清洗频道名称并匹配EPG和Logo信息，逐个产出处理后的频道（Channel）
+    
+    按批处理：整批清洗后一次性完成简繁转换，内存占用只与批大小有关；
+    传入 pool（ChannelProcessPool）时各批在子进程中处理，产出顺序不变
+    """
+    batches = iter_batches(channels, batch_size or CHANNEL_BATCH_SIZE)
+    if pool is not None and pool.supports(epg_index, logo_index):
+        results = pool.map_batches(batches)
+        while True:
+            # 包含解析、等待子进程处理和取回结果的时间
+            with run_report.stage("convert"):
+                result = next(results, None)
+            if result is None:
+                return
+            batch, counts, rule_hits, fuzzy_matches = result
+            for name, value in counts.items():
+                run_report.count(name, value)
+            if rule_hits:
+                with _rule_hits_lock:
+                    _rule_hits.update(rule_hits)
+            if fuzzy_matches:
+                epg_index.fuzzy.record_matches(fuzzy_matches)
+            yield from batch
+    
+    while True:
+        # 拉取下一批记录的耗时即为解析耗时
+        with run_report.stage("parse"):
+            batch = next(batches, None)
+        if batch is None:
+            return
+        
+        # 清洗频道名称（只对直播源数据进行清洗）
+        with run_report.stage("clean"):
+            run_report.count("renamed", _clean_batch(batch))
+        with run_report.stage("normalize"):
+            norm_names = normalize_channel_names([channel.name for channel in batch])
+        
+        with run_report.stage("match"):
+            epg_matched, logo_matched = _match_batch(batch, norm_names, epg_index, logo_index)
+            run_report.count("epg_matched", epg_matched)
+            run_report.count("logo_matched", logo_matched)
+        yield from batch
+
+_HLS_CONTENT_TYPES = ("mpegurl",)
+
+def _is_hls(url, content_type, head):
+    return urlsplit(url).path.lower().endswith(".m3u8") or any(t in content_type for t in _HLS_CONTENT_TYPES) or head.startswith(b"#EXTM3U")
+
+def _first_playlist_uri(playlist_text):
+    """返回播放列表中第一个URI（多码率列表中为子播放列表，否则为分片）"""
+    for line in playlist_text.splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            return line
+    return None
+
+class StreamProber:
+    """并发探测频道URL的可用性和首字节时间
+    
+    HTTP(S)地址发送GET请求并读取第一个数据块；HLS播放列表会继续请求（多码率时先进入第一个子播放列表）
+    第一个分片，startup 为从请求播放列表到收到分片首字节的总耗时，即播放器起播前的等待时间。
+    同一URL在一次运行中只探测一次，结果在各直播源之间共享；总并发数和同一主机的并发数均有上限
+    """
+
+    MAX_PLAYLIST_BYTES = 512 * 1024
+    MAX_PLAYLIST_DEPTH = 3
+
+    def __init__(self, timeout=PROBE_TIMEOUT, max_workers=PROBE_WORKERS, max_per_host=PROBE_MAX_PER_HOST, session=None):
+        self.timeout = timeout
+        self.max_per_host = max_per_host
+        self._session = session or self._create_session(max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._results = {}
+        self._host_semaphores = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _create_session(max_workers):
+        session = requests.Session()
+        session.headers["User-Agent"] = BROWSER_USER_AGENTS[0]
+        adapter = requests.adapters.HTTPAdapter(pool_connections=64, pool_maxsize=max_workers)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _host_slot(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            semaphore = self._host_semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.max_per_host)
+                self._host_semaphores[host] = semaphore
+        return semaphore
+
+    def _get(self, url):
+        """请求URL，返回 (响应, 首字节时间, 内容)；HLS播放列表读取完整内容（有大小上限），其他只读取第一个数据块"""
+        start = time.perf_counter()
+        with self._host_slot(url):
+            with self._session.get(url, timeout=self.timeout, stream=True) as response:
+                chunks = response.iter_content(chunk_size=16 * 1024)
+                body = next(chunks, b"")
+                ttfb = time.perf_counter() - start
+                if response.ok and _is_hls(response.url, response.headers.get("Content-Type", "").lower(), body[:16]):
+                    for chunk in chunks:
+                        body += chunk
+                        if len(body) >= self.MAX_PLAYLIST_BYTES:
+                            break
+        return response, ttfb, body
+
+    def probe(self, url):
+        """探测单个URL，返回 {"ok", "status", "ttfb", "startup", "hls", "error"}
+        
+        ok 为 None 表示无法用HTTP探测的协议（如rtmp、rtsp），不视为失效
+        """
+        result = {"ok": None, "status": None, "ttfb": None, "startup": None, "hls": False, "error": None}
+        if not url.lower().startswith(("http://", "https://")):
+            result["error"] = "unsupported protocol"
+            return result
+        
+        start = time.perf_counter()
+        try:
+            response, ttfb, body = self._get(url)
+            result["status"] = response.status_code
+            result["ttfb"] = round(ttfb, 4)
+            if not response.ok or not body:
+                result["ok"] = False
+                result["error"] = f"HTTP {response.status_code}" if not response.ok else "empty response"
+                return result
+            
+            # HLS：沿播放列表请求到第一个分片（多码率列表先进入第一个子播放列表）
+            depth = 0
+            while _is_hls(response.url, response.headers.get("Content-Type", "").lower(), body[:16]):
+                result["hls"] = True
+                if depth == self.MAX_PLAYLIST_DEPTH:
+                    raise ValueError("playlist nesting too deep")
+                depth += 1
+                uri = _first_playlist_uri(body.decode("utf-8", errors="replace"))
+                if uri is None:
+                    raise ValueError("playlist has no segments")
+                next_url = urljoin(response.url, uri)
+                response, _, body = self._get(next_url)
+                if not response.ok or not body:
+                    raise ValueError(f"HTTP {response.status_code} for {next_url}")
+            
+            result["ok"] = True
+            result["startup"] = round(time.perf_counter() - start, 4)
+        except Exception as e:
+            result["ok"] = False
+            result["error"] = str(e)[:200]
+        return result
+
+    def probe_all(self, urls):
+        """并发探测多个URL，返回 {URL: 结果}"""
+        futures = {}
+        with self._lock:
+            for url in urls:
+                if url in futures:
+                    continue
+                future = self._results.get(url)
+                if future is None:
+                    future = self._executor.submit(self.probe, url)
+                    self._results[url] = future
+                futures[url] = future
+        return {url: future.result() for url, future in futures.items()}
+
+    @staticmethod
+    def rank(result):
+        """排序键：可用的按起播耗时从快到慢，其次是无法探测的，最后是失效的"""
+        if result["ok"]:
+            return (0, result["startup"])
+        if result["ok"] is None:
+            return (1, 0)
+        return (2, 0)
+
+    def rank_channels(self, channels, drop_dead=False):
+        """探测所有频道的URL，同一频道（分组和名称相同）的多个URL按速度重新排序
+        
+        每个频道仍占据原来的位置，只交换频道内部URL的顺序；drop_dead 时删除失效的URL
+        """
+        results = self.probe_all(channel.url for channel in channels)
+        
+        slots = defaultdict(list)
+        for index, channel in enumerate(channels):
+            slots[(channel.group, channel.name)].append(index)
+        
+        ranked = list(channels)
+        for indices in slots.values():
+            if len(indices) > 1:
+                ordered = sorted((channels[index] for index in indices), key=lambda channel: self.rank(results[channel.url]))
+                for index, channel in zip(indices, ordered):
+                    ranked[index] = channel
+        
+        if drop_dead:
+            ranked = [channel for channel in ranked if results[channel.url]["ok"] is not False]
+        return ranked, results
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self._session.close()
+
+def probe_source_channels(channels, prober, output_filename, drop_dead=False):
+    """探测一个直播源的所有频道并记录统计，返回重新排序（及删除失效URL）后的频道"""
+    with run_report.stage("probe"):
+        ranked, results = prober.rank_channels(channels, drop_dead)
+    
+    ok_count = sum(1 for result in results.values() if result["ok"])
+    dead_count = sum(1 for result in results.values() if result["ok"] is False)
+    startups = sorted(result["startup"] for result in results.values() if result["ok"])
+    run_report.count("probed_urls", len(results))
+    run_report.count("probe_ok", ok_count)
+    run_report.count("probe_dead", dead_count)
+    run_report.count("probe_dropped", len(channels) - len(ranked))
+    
+    median = f"{startups[len(startups) // 2] * 1000:.0f}ms" if startups else "-"
+    logger.info(f"{output_filename} URL探测: {len(results)} 个URL，可用 {ok_count} 个，失效 {dead_count} 个，"
+                f"无法探测 {len(results) - ok_count - dead_count} 个，起播耗时中位数 {median}"
+                + (f"，已删除 {len(channels) - len(ranked)} 个失效条目" if drop_dead else ""))
+    return ranked
+
+def read_m3u_channels(path):
+    """读取本脚本生成的M3U文件，返回频道列表"""
+    channels = []
+    extinf_line = None
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line.startswith("#EXTINF"):
+                extinf_line = line
+            elif line and not line.startswith("#") and extinf_line is not None:
+                channels.append(parse_extinf(extinf_line, line))
+                extinf_line = None
+    return channels
+
+class ChannelMerger:
+    """把所有直播源的频道合并为一个去重的总M3U
+    
+    以标准化名称（与Logo匹配相同）为键建立哈希索引，同一频道在各源中的URL按源的优先级、
+    源内的原始顺序排列并去除重复URL；频道使用优先级最高的源中第一次出现时的名称、分组和tvg属性，
+    按分组第一次出现的顺序输出。总耗时与频道条目总数成线性关系
+    """
+
+    def __init__(self, priority=None, max_urls=None):
+        self.priority = list(priority or [])
+        self.max_urls = max_urls
+        self._sources = {}
+        self._lock = threading.Lock()
+
+    def add_source(self, output_filename, channels):
+        """记录一个直播源最终写入文件的频道"""
+        with self._lock:
+            self._sources[output_filename] = channels
+
+    def source_order(self, output_filenames):
+        """合并顺序：priority 中列出的源在前，其余按配置中的顺序"""
+        listed = [name for name in self.priority if name in output_filenames]
+        return listed + [name for name in output_filenames if name not in listed]
+
+    def merge(self, output_filenames):
+        """按优先级合并，返回 (频道列表, 统计信息)"""
+        merged_channels = {}
+        total_entries = 0
+        duplicate_urls = 0
+        for output_filename in self.source_order(output_filenames):
+            channels = self._sources.get(output_filename)
+            if not channels:
+                continue
+            total_entries += len(channels)
+            # 名称在生成时已标准化过，这里基本都是缓存命中
+            norm_names = normalize_channel_names([channel.name for channel in channels])
+            for channel, norm_name in zip(channels, norm_names):
+                merged_channel = merged_channels.get(norm_name)
+                if merged_channel is None:
+                    merged_channel = merged_channels[norm_name] = (channel, {})
+                urls = merged_channel[1]
+                if channel.url in urls:
+                    duplicate_urls += 1
+                else:
+                    urls[channel.url] = None
+        
+        # 按分组第一次出现的顺序输出，分组内按频道第一次出现的顺序
+        groups = {}
+        for channel, urls in merged_channels.values():
+            groups.setdefault(channel.group, []).append((channel, urls))
+        
+        merged = []
+        for group_channels in groups.values():
+            for channel, urls in group_channels:
+                for channel_url in islice(urls, self.max_urls):
+                    merged.append(channel if channel_url == channel.url else channel.with_url(channel_url))
+        
+        stats = {
+            "sources": sum(1 for name in output_filenames if self._sources.get(name)),
+            "entries": total_entries,
+            "channels": len(merged_channels),
+            "urls": len(merged),
+            "duplicate_urls": duplicate_urls,
+        }
+        return merged, stats
+
+def write_merged_playlist(merger, output_filenames, merged_filename):
+    """合并所有直播源并写入总M3U文件"""
+    with run_report.stage("merge"):
+        merged, stats = merger.merge(output_filenames)
+    if not merged:
+        logger.warning(f"警告: 没有可合并的频道，跳过生成 {merged_filename}")
+        return False
+    
+    write_m3u(merged_filename, merged)
+    
+    for key, value in stats.items():
+        run_report.count(f"merge_{key}", value)
+    logger.info(f"合并M3U已生成: {merged_filename} ({stats['sources']} 个源的 {stats['entries']} 个条目合并为 "
+                f"{stats['channels']} 个频道、{stats['urls']} 个URL，去除重复URL {stats['duplicate_urls']} 个)")
+    return True
+
+def process_single_source(output_filename, source_config, epg_index, logo_index, manifest=None, prober=None, merger=None, pool=None):
+    """处理单个直播源
+    
+    传入 prober 时探测所有频道URL，按 PROBE_MODE 排序或删除失效条目；传入 merger 时把写入的条目交给合并；
+    传入 pool 时在进程池中清洗和匹配频道
+    """
     list_url = source_config["url"]
     user_agent = source_config.get("user_agent")
     referer = source_config.get("referer")
@@ -544,19 +2119,20 @@ def process_single_source(output_filename, source_config, epg_channels, logo_sou
     # 对于特别难以访问的源，增加重试次数
     max_retries = 5 if "catvod.com" in list_url else 3
     
-    print(f"正在获取: {list_url}")
+    logger.info(f"正在获取: {list_url}")
     list_data = fetch_url(list_url, f"频道列表({output_filename})", encoding, referer, user_agent, max_retries)
     
     if not list_data:
-        print(f"错误: 无法获取 {output_filename} 的数据")
+        logger.error(f"错误: 无法获取 {output_filename} 的数据")
         return False
     
     # 检查数据是否看起来像二进制数据
     if list_data.startswith("b'") or "\\x" in list_data[:100]:
-        print(f"警告: {output_filename} 的数据可能仍然是二进制格式")
+        logger.warning(f"警告: {output_filename} 的数据可能仍然是二进制格式")
         # 尝试直接处理原始字节数据
         try:
-            response = requests.get(list_url, headers={"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"})
+            with host_slot(list_url):
+                response = _session.get(list_url, headers={"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"})
             raw_bytes = response.content
             
             # 尝试多种编码
@@ -564,180 +2140,217 @@ def process_single_source(output_filename, source_config, epg_channels, logo_sou
                 try:
                     list_data = raw_bytes.decode(enc)
                     if any(keyword in list_data for keyword in ['CCTV', '卫视', 'http']):
-                        print(f"通过直接请求并使用 {enc} 编码成功解码")
+                        logger.info(f"通过直接请求并使用 {enc} 编码成功解码 {output_filename} 的数据")
                         break
                 except:
                     continue
         except Exception as e:
-            print(f"直接请求也失败: {e}")
+            logger.warning(f"直接请求也失败: {e}")
             return False
     
-    # 检查数据质量 - 计算有效行的比例
-    lines = list_data.splitlines()
-    valid_lines = [line for line in lines if is_valid_m3u_line(line)]
-    valid_ratio = len(valid_lines) / len(lines) if lines else 0
+    # 所有输入都未变化时跳过生成（探测结果随时间变化，启用探测时总是重新生成）
+    input_digest = manifest.digest_for(source_config, list_data) if manifest else None
+    if manifest and prober is None and manifest.is_unchanged(output_filename, input_digest):
+        logger.info(f"输入未变化，跳过生成: {output_filename}")
+        run_report.current.status = "unchanged"
+        if merger is not None:
+            # 输出文件与本次会生成的内容相同，直接读取用于合并
+            merger.add_source(output_filename, read_m3u_channels(previous_output_path(output_filename)))
+        return True
     
-    print(f"数据统计: 总行数: {len(lines)}, 有效行: {len(valid_lines)}, 有效比例: {valid_ratio:.1%}")
+    # 解析列表数据并生成M3U（解析的同时统计数据质量）
+    parser = ChannelListParser()
+    channels = iter_channels(parser.parse(iter_text_lines(list_data)), epg_index, logo_index, pool=pool)
+    if prober is None and merger is None:
+        # 不需要完整的频道列表时，边处理边写入文件
+        valid_channel_count = write_m3u(output_filename, channels)
+    else:
+        channels = list(channels)
+        if prober is not None:
+            channels = probe_source_channels(channels, prober, output_filename, drop_dead=PROBE_MODE == "drop")
+        valid_channel_count = write_m3u(output_filename, channels)
     
-    if valid_ratio < 0.1 and len(valid_lines) < 10:  # 如果有效行比例低于10%且有效行少于10个
-        print(f"警告: {output_filename} 的数据质量太差，跳过处理")
-        # 但仍然尝试处理，可能会有一些有效频道
-        # return False
+    run_report.count("lines", parser.total_lines)
+    run_report.count("valid_lines", parser.valid_lines)
+    run_report.count("skipped_lines", parser.skipped_lines)
+    run_report.count("group_lines", parser.group_lines)
+    run_report.count("channels", valid_channel_count)
     
-    # 解析列表数据并生成M3U
-    current_group = "默认分组"
-    m3u_lines = ["#EXTM3U"]
-    line_count = 0
-    valid_channel_count = 0
-    skipped_lines = 0
+    if parser.skipped_lines > 0:
+        logger.info(f"{output_filename}: 跳过了 {parser.skipped_lines} 个无效行（其中不支持的协议 {parser.unsupported_lines} 个）")
     
-    for line in list_data.splitlines():
-        line = line.strip()
-        line_count += 1
-        
-        # 跳过空行
-        if not line:
-            continue
-            
-        # ========== 修改开始：支持分组行带额外参数（如 ,DE=3） ==========
-        # 检查是否是分组行 (支持多种格式，包括末尾带额外参数如",DE=3")
-        # 匹配模式: 任意内容 + 逗号 + #genre# 或 genre + 可选的逗号和额外参数
-        genre_match = re.search(r'^(.*?),(#genre#|genre)(?:,.*)?$', line, re.IGNORECASE)
-        if genre_match:
-            current_group = genre_match.group(1).strip()
-            # 尝试修复Unicode转义序列
-            current_group = fix_unicode_escape(current_group)
-            print(f"检测到分组: {current_group} (第{line_count}行)")
-            continue
-        # ========== 修改结束 ==========
-            
-        # 解析频道行 - 尝试多种分隔符
-        parts = None
-        separators = [",", " ", "\t"]
-        
-        for sep in separators:
-            if sep in line:
-                parts = line.split(sep, 1)
-                if len(parts) >= 2:
-                    break
-        
-        if not parts or len(parts) < 2:
-            skipped_lines += 1
-            if skipped_lines <= 3:  # 只显示前3个解析失败的例子
-                # 显示行的前50个字符，避免输出过长
-                display_line = line[:50] + "..." if len(line) > 50 else line
-                print(f"警告: 无法解析第{line_count}行: {display_line}")
-            continue
-            
-        channel_name, channel_url = parts
-        channel_name = channel_name.strip()
-        channel_url = channel_url.strip()
-        
-        # 尝试修复Unicode转义序列
-        channel_name = fix_unicode_escape(channel_name)
-        
-        # 跳过无效的频道行
-        if not channel_name or not channel_url:
-            skipped_lines += 1
-            continue
-            
-        # 检查URL是否以常见协议开头 - 添加p3p协议支持
-        if not re.match(r'^(http|https|rtmp|rtsp|mms|p3p|P2p|p2p|mitv)://', channel_url, re.IGNORECASE):
-            skipped_lines += 1
-            if skipped_lines <= 5:  # 只显示前5个被跳过的URL例子
-                print(f"跳过不支持的协议: {channel_url[:50]}...")
-            continue
-            
-        # 清洗频道名称（只对直播源数据进行清洗）
-        cleaned_channel_name = clean_channel_name(channel_name)
-        norm_channel_name = normalize_channel_name(cleaned_channel_name)
-        
-        # 匹配EPG信息 - 按顺序查找，找到第一个匹配的
-        tvg_id = ""
-        tvg_name = ""
-        tvg_logo = ""
-        
-        # 新增：为EPG匹配创建一个临时名称，去掉末尾的4K、8K和16K相关字样
-        epg_norm_name = norm_channel_name
-        # 去掉末尾的4k、8k和16k相关字样（只用于EPG匹配）
-        epg_norm_name = re.sub(r'\s*-\s*4k\s*$', '', epg_norm_name, flags=re.IGNORECASE)
-        epg_norm_name = re.sub(r'\s*4k\s*$', '', epg_norm_name, flags=re.IGNORECASE)
-        epg_norm_name = re.sub(r'\s*-\s*8k\s*$', '', epg_norm_name, flags=re.IGNORECASE)
-        epg_norm_name = re.sub(r'\s*8k\s*$', '', epg_norm_name, flags=re.IGNORECASE)
-        epg_norm_name = re.sub(r'\s*-\s*16k\s*$', '', epg_norm_name, flags=re.IGNORECASE)
-        epg_norm_name = re.sub(r'\s*16k\s*$', '', epg_norm_name, flags=re.IGNORECASE)
-        
-        # 按顺序遍历EPG频道列表，使用处理后的epg_norm_name进行匹配
-        for epg_channel in epg_channels:
-            # 对EPG频道名称也进行同样的处理
-            epg_channel_norm_name = normalize_channel_name(epg_channel["channel_name"])
-            epg_channel_norm_name = re.sub(r'\s*-\s*4k\s*$', '', epg_channel_norm_name, flags=re.IGNORECASE)
-            epg_channel_norm_name = re.sub(r'\s*4k\s*$', '', epg_channel_norm_name, flags=re.IGNORECASE)
-            epg_channel_norm_name = re.sub(r'\s*-\s*8k\s*$', '', epg_channel_norm_name, flags=re.IGNORECASE)
-            epg_channel_norm_name = re.sub(r'\s*8k\s*$', '', epg_channel_norm_name, flags=re.IGNORECASE)
-            epg_channel_norm_name = re.sub(r'\s*-\s*16k\s*$', '', epg_channel_norm_name, flags=re.IGNORECASE)
-            epg_channel_norm_name = re.sub(r'\s*16k\s*$', '', epg_channel_norm_name, flags=re.IGNORECASE)
-            
-            if epg_norm_name == epg_channel_norm_name:
-                tvg_id = epg_channel["channel_id"]
-                tvg_name = epg_channel["channel_name"]
-                break
-        
-        # 匹配Logo - 按顺序查找，找到第一个匹配的（仍然使用原始norm_channel_name）
-        for logo_map in logo_sources:
-            if norm_channel_name in logo_map:
-                tvg_logo = logo_map[norm_channel_name]
-                break
-        
-        # 构建M3U条目（使用原始cleaned_channel_name）
-        attr_parts = []
-        if tvg_id:
-            attr_parts.append(f'tvg-id="{tvg_id}"')
-        if tvg_name:
-            attr_parts.append(f'tvg-name="{tvg_name}"')
-        if tvg_logo:
-            attr_parts.append(f'tvg-logo="{tvg_logo}"')
-        if current_group:
-            attr_parts.append(f'group-title="{current_group}"')
-        
-        attrs = " ".join(attr_parts)
-        m3u_lines.append(f'#EXTINF:-1 {attrs},{cleaned_channel_name}')
-        m3u_lines.append(channel_url)
-        valid_channel_count += 1
+    stats = run_report.current
+    logger.info(f"{output_filename}: 检测到 {parser.group_lines} 个分组行，清洗修改了 {stats.counters['renamed']} 个频道名称")
+    
+    # 检查数据质量 - 有效行的比例
+    logger.info(f"{output_filename} 数据统计: 总行数: {parser.total_lines}, 有效行: {parser.valid_lines}, 有效比例: {parser.valid_ratio:.1%}")
     
-    if skipped_lines > 0:
-        print(f"跳过了 {skipped_lines} 个无效行")
+    if parser.valid_ratio < 0.1 and parser.valid_lines < 10:  # 如果有效行比例低于10%且有效行少于10个
+        logger.warning(f"警告: {output_filename} 的数据质量太差")
     
-    # 写入文件
     if valid_channel_count > 0:
-        with open(output_filename, "w", encoding="utf-8") as f:
-            f.write("\n".join(m3u_lines))
+        if manifest:
+            manifest.record(output_filename, input_digest)
+        if merger is not None:
+            merger.add_source(output_filename, channels)
         
-        print(f"M3U文件已生成: {output_filename} (包含{valid_channel_count}个频道)")
+        logger.info(f"M3U文件已生成: {output_filename} (包含{valid_channel_count}个频道)")
         return True
     else:
-        print(f"警告: 源 {list_url} 没有有效的频道数据")
+        logger.warning(f"警告: 源 {list_url} 没有有效的频道数据")
         return False
 
-def main():
-    """主处理函数"""
+def previous_output_path(output_filename):
+    """上次生成的输出文件的路径（位于 PREVIOUS_OUTPUT_DIR）"""
+    return os.path.join(PREVIOUS_OUTPUT_DIR, output_filename)
+
+class BuildManifest:
+    """记录每个输出文件所用输入的摘要及生成的文件内容的摘要，用于增量生成
+    
+    摘要覆盖直播源原始内容、源配置、EPG数据、Logo数据、清洗规则版本和脚本版本，
+    全部未变化且上次的输出文件仍是记录中生成的那一份时跳过该输出的生成
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.inputs_digest = ""
+        self._entries = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except Exception as e:
+                logger.warning(f"读取生成记录失败: {e}")
+
+    def set_shared_inputs(self, epg_data, logo_datas):
+        """记录所有直播源共用的输入（EPG和Logo数据）"""
+        digest = hashlib.sha256()
+        digest.update(f"{GENERATOR_VERSION}:{RULESET_VERSION}:{channel_names.fingerprint()}".encode("utf-8"))
+        for data in [epg_data, *logo_datas]:
+            digest.update(b"\0")
+            digest.update((data or "").encode("utf-8"))
+        self.inputs_digest = digest.hexdigest()
+
+    def digest_for(self, source_config, list_data):
+        """计算单个输出文件的输入摘要"""
+        digest = hashlib.sha256()
+        digest.update(self.inputs_digest.encode("utf-8"))
+        digest.update(json.dumps(source_config, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+        digest.update(list_data.encode("utf-8"))
+        return digest.hexdigest()
+
+    def is_unchanged(self, output_filename, digest):
+        if not self.path:
+            return False
+        with self._lock:
+            recorded = self._entries.get(output_filename)
+        if not isinstance(recorded, dict) or recorded.get("inputs") != digest:
+            return False
+        previous_path = previous_output_path(output_filename)
+        if WRITE_GZIP and not os.path.exists(f"{previous_path}.gz"):
+            return False
+        # 上次的输出可能来自其他运行（如推送失败后重新检出的旧文件），内容与记录一致时才能沿用
+        return os.path.exists(previous_path) and _file_fingerprint(previous_path) == recorded.get("output")
+
+    def record(self, output_filename, digest):
+        """记录输入摘要及刚生成的输出文件的摘要"""
+        entry = {"inputs": digest, "output": _file_fingerprint(output_filename)}
+        with self._lock:
+            self._entries[output_filename] = entry
+
+    def save(self):
+        if not self.path:
+            return False
+        with self._lock:
+            data = dict(self._entries)
+        try:
+            write_text_atomic(self.path, json.dumps(data, ensure_ascii=False, indent=2))
+        except Exception as e:
+            logger.warning(f"写入生成记录失败: {e}")
+            return False
+        return True
+
+def _process_source_task(output_filename, source_config, epg_index, logo_index, manifest, prober=None, merger=None, pool=None):
+    """处理单个直播源，异常时返回False而不是中断其他源"""
+    logger.info(f"\n开始处理: {output_filename} (源: {source_config['url']})")
+    with run_report.source(output_filename) as stats:
+        try:
+            success = process_single_source(output_filename, source_config, epg_index, logo_index, manifest, prober, merger, pool)
+        except Exception as e:
+            logger.error(f"处理{output_filename}时发生错误: {e}")
+            stats.status = "error"
+            return False
+        if stats.status is None:
+            stats.status = "success" if success else "failed"
+        return success
+
+def process_all_sources(live_urls, epg_index, logo_index, manifest=None, max_workers=None, prober=None, merger=None, pool=None):
+    """处理所有直播源，返回 {输出文件名: 是否成功}（顺序与配置一致）
+    
+    max_workers 大于1时使用线程池并发处理，慢源或重试中的源不会阻塞其他源；
+    同一主机的并发请求数由 host_slot 限制
+    """
+    if max_workers is None:
+        max_workers = MAX_WORKERS
+    
+    results = {}
+    if max_workers <= 1 or len(live_urls) <= 1:
+        for output_filename, source_config in live_urls.items():
+            results[output_filename] = _process_source_task(output_filename, source_config, epg_index, logo_index, manifest, prober, merger, pool)
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(live_urls))) as executor:
+            futures = {
+                output_filename: executor.submit(_process_source_task, output_filename, source_config, epg_index, logo_index, manifest, prober, merger, pool)
+                for output_filename, source_config in live_urls.items()
+            }
+            for output_filename, future in futures.items():
+                results[output_filename] = future.result()
+    
+    logger.info("\n各直播源处理状态:")
+    for output_filename, success in results.items():
+        logger.info(f"  {output_filename}: {'成功' if success else '失败'}")
+    return results
+
+def main(config_path=None, only_sources=None):
+    """主处理函数
+    
+    only_sources 为输出文件名列表时只刷新这些直播源（合并输出仍包含所有已生成的文件）
+    """
+    setup_logging()
+    
     # 1. 读取配置文件
-    config_path = os.path.join(os.path.dirname(__file__), "..", "files.json")
+    if config_path is None:
+        config_path = os.path.join(os.path.dirname(__file__), "..", "files.json")
     try:
         with open(config_path, "r", encoding="utf-8") as f:
             config = json.load(f)
     except Exception as e:
-        print(f"读取配置文件失败: {e}")
+        logger.warning(f"读取配置文件失败: {e}")
         return False
     
+    name_cache_path = os.path.join(CACHE_DIR, "channel_names.json") if CACHE_DIR else None
+    encodings_path = os.path.join(CACHE_DIR, "encodings.json") if CACHE_DIR else None
+    load_name_cache(name_cache_path)
+    load_source_encodings(encodings_path)
+    
     snow_epg_json = config.get("snow_epg_json")
     live_urls = config.get("live_url", {})
     logo_jsons = config.get("logo_json", [])
     
     if not snow_epg_json or not live_urls:
-        print("配置文件缺少必要字段")
+        logger.info("配置文件缺少必要字段")
         return False
     
+    all_output_filenames = list(live_urls)
+    if only_sources:
+        unknown = [name for name in only_sources if name not in live_urls]
+        if unknown:
+            logger.warning(f"配置中没有这些直播源: {', '.join(unknown)}")
+        live_urls = {name: source_config for name, source_config in live_urls.items() if name in only_sources}
+        if not live_urls:
+            return False
+    
     # 2. 获取EPG数据
     epg_data = fetch_url(snow_epg_json, "EPG信息")
     epg_channels = []
@@ -749,74 +2362,147 @@ def main():
             
             # 创建标准化名称到原始频道的映射（用于统计）
             norm_name_count = {}
-            for channel in epg_channels:
-                norm_name = normalize_channel_name(channel["channel_name"])
+            for norm_name in normalize_channel_names([channel["channel_name"] for channel in epg_channels]):
                 norm_name_count[norm_name] = norm_name_count.get(norm_name, 0) + 1
             
             # 统计去重后的EPG频道数量
             unique_count = len(norm_name_count)
             
-            print(f"成功加载EPG数据，包含 {original_count} 个频道（{unique_count} 个唯一频道）")
+            logger.info(f"成功加载EPG数据，包含 {original_count} 个频道（{unique_count} 个唯一频道）")
         except Exception as e:
-            print(f"解析EPG数据失败: {e}")
+            logger.warning(f"解析EPG数据失败: {e}")
             epg_channels = []
     else:
-        print("警告: 无法获取EPG数据，将跳过EPG匹配")
+        logger.warning("警告: 无法获取EPG数据，将跳过EPG匹配")
     
-    # 3. 获取所有logo数据
-    logo_sources = []
-    for logo_url in logo_jsons:
-        logo_data = fetch_url(logo_url, f"Logo数据({logo_url})")
-        if logo_data:
-            try:
-                logos = json.loads(logo_data)
-                logo_map = {}
-                for logo in logos:
-                    norm_name = normalize_channel_name(logo["logo_name"])
-                    logo_map[norm_name] = logo["logo_url"]
-                logo_sources.append(logo_map)
-                print(f"成功加载Logo数据: {logo_url} (包含 {len(logo_map)} 个Logo)")
-            except Exception as e:
-                print(f"解析Logo数据失败: {logo_url}, 错误: {e}")
-                logo_sources.append({})
-        else:
-            logo_sources.append({})
+    # 构建EPG匹配索引（所有直播源共用）
+    epg_index = build_epg_index(epg_channels, FUZZY_EPG_THRESHOLD)
     
-    # 4. 处理每个直播源
-    success_count = 0
-    for output_filename, source_config in live_urls.items():
-        print(f"\n开始处理: {output_filename} (源: {source_config['url']})")
-        try:
-            success = process_single_source(output_filename, source_config, epg_channels, logo_sources)
-            if success:
-                success_count += 1
-        except Exception as e:
-            print(f"处理{output_filename}时发生错误: {e}")
+    # 3. 获取所有logo数据，合并为一个按优先级解析好的索引
+    logo_index, logo_datas = load_logos(logo_jsons, os.path.join(CACHE_DIR, "logo_index.bin") if CACHE_DIR else None)
     
-    print(f"\n处理完成! 成功生成 {success_count}/{len(live_urls)} 个M3U文件")
+    manifest = BuildManifest(os.path.join(CACHE_DIR, "manifest.json") if CACHE_DIR else None)
+    manifest.set_shared_inputs(epg_data, logo_datas)
+    
+    # 4. 处理每个直播源（并发下载和解析），按需探测频道URL
+    prober = StreamProber() if PROBE_MODE in ("reorder", "drop") else None
+    # 可选：合并所有直播源为一个总M3U，配置示例 "merged_output": {"filename": "all.m3u", "priority": ["tv12.m3u"], "max_urls": 10}
+    merge_config = config.get("merged_output")
+    merger = ChannelMerger(merge_config.get("priority"), merge_config.get("max_urls")) if merge_config else None
+    pool = ChannelProcessPool(epg_index, logo_index, PROCESS_WORKERS) if PROCESS_WORKERS > 0 else None
+    try:
+        results = process_all_sources(live_urls, epg_index, logo_index, manifest, prober=prober, merger=merger, pool=pool)
+    finally:
+        if prober is not None:
+            prober.close()
+        if pool is not None:
+            pool.close()
+    success_count = sum(1 for success in results.values() if success)
+    
+    if merger is not None:
+        # 只刷新部分直播源时，其余直播源使用已有的输出文件参与合并
+        for output_filename in all_output_filenames:
+            previous_path = previous_output_path(output_filename)
+            if output_filename not in live_urls and os.path.exists(previous_path):
+                merger.add_source(output_filename, read_m3u_channels(previous_path))
+        write_merged_playlist(merger, all_output_filenames, merge_config["filename"])
+    
+    save_name_cache(name_cache_path)
+    save_source_encodings(encodings_path)
+    manifest.save()
+    
+    log_rule_summary()
+    
+    report_extra = {"success_count": success_count, "source_count": len(live_urls)}
+    if epg_index.fuzzy is not None:
+        fuzzy_matches = epg_index.fuzzy.matches
+        report_extra["fuzzy_epg"] = {"threshold": FUZZY_EPG_THRESHOLD, "matched": len(fuzzy_matches), "matches": fuzzy_matches}
+        logger.info(f"EPG模糊匹配: {len(fuzzy_matches)} 个名称（阈值 {FUZZY_EPG_THRESHOLD}）")
+    report = run_report.to_dict(**report_extra)
+    if report["slowest_source"]:
+        slowest_stats = report["sources"][report["slowest_source"]]
+        logger.info(f"\n耗时最长的直播源: {report['slowest_source']} ({slowest_stats['stages'].get('total', 0):.2f} 秒)")
+    run_report.save(RUN_REPORT_PATH, **report_extra)
+    
+    logger.info(f"\n处理完成! 成功生成 {success_count}/{len(live_urls)} 个M3U文件")
     return success_count > 0
 
-if __name__ == "__main__":
-    # 安装依赖检查
-    try:
-        import zhconv
-    except ImportError:
-        print("请先安装zhconv库: pip install zhconv")
-        exit(1)
-        
-    try:
-        import requests
-    except ImportError:
-        print("请先安装requests库: pip install requests")
-        exit(1)
-        
-    try:
-        import chardet
-    except ImportError:
-        print("请先安装chardet库: pip install chardet")
-        exit(1)
-        
-    success = main()
+def _missing_dependencies(module_names):
+    """检查依赖是否已安装（只查找模块，不导入）"""
+    return [name for name in module_names if importlib.util.find_spec(name) is None]
+
+def _cmd_generate(args):
+    missing = _missing_dependencies(["zhconv", "chardet"])
+    if missing:
+        for name in missing:
+            print(f"请先安装{name}库: pip install {name}")
+        return 1
+    success = main(args.config, args.source)
     if not success:
         print("处理过程中出现错误")
-        exit(1)
\ No newline at end of file
+    return 0 if success else 1
+
+def _cmd_clean(args):
+    """输出每个名称的清洗及标准化结果，用于调试清洗规则"""
+    for name in args.names:
+        rule_hits = []
+        cleaned = _apply_channel_name_rules(name, rule_hits)
+        norm_name = normalize_channel_name(cleaned)
+        print(f"{name}\t{cleaned}\t{norm_name}")
+        if rule_hits:
+            logger.debug(f"  命中规则: {', '.join(rule_hits)}")
+    return 0
+
+def _cmd_normalize(args):
+    """输出名称标准化（简体、小写）及去除清晰度后缀后的EPG匹配名称"""
+    for name, norm_name in zip(args.names, normalize_channel_names(args.names)):
+        print(f"{name}\t{norm_name}\t{strip_resolution_suffix(norm_name)}")
+    return 0
+
+def _cmd_probe(args):
+    """探测URL的可用性和起播耗时，输出JSON"""
+    prober = StreamProber(timeout=args.timeout)
+    try:
+        results = prober.probe_all(args.urls)
+    finally:
+        prober.close()
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    return 0 if all(result["ok"] is not False for result in results.values()) else 1
+
+def cli(argv=None):
+    """命令行入口，不带子命令时等同于 generate"""
+    parser = argparse.ArgumentParser(description="根据 files.json 生成M3U直播源，及调试名称清洗、URL探测的辅助命令")
+    parser.add_argument("-v", "--verbose", action="store_true", help="输出调试日志及模块导入耗时")
+    subparsers = parser.add_subparsers(dest="command")
+    
+    generate_parser = subparsers.add_parser("generate", help="生成所有（或指定的）M3U文件（默认命令）")
+    generate_parser.add_argument("--config", help="配置文件路径，默认 ../files.json")
+    generate_parser.add_argument("--source", action="append", metavar="OUTPUT", help="只刷新指定输出文件名的直播源，可重复")
+    generate_parser.set_defaults(handler=_cmd_generate)
+    
+    clean_parser = subparsers.add_parser("clean", help="输出频道名称的清洗结果")
+    clean_parser.add_argument("names", nargs="+")
+    clean_parser.set_defaults(handler=_cmd_clean)
+    
+    normalize_parser = subparsers.add_parser("normalize", help="输出频道名称的标准化结果")
+    normalize_parser.add_argument("names", nargs="+")
+    normalize_parser.set_defaults(handler=_cmd_normalize)
+    
+    probe_parser = subparsers.add_parser("probe", help="探测URL的可用性和起播耗时")
+    probe_parser.add_argument("urls", nargs="+")
+    probe_parser.add_argument("--timeout", type=float, default=PROBE_TIMEOUT, help=f"单个请求超时秒数（默认{PROBE_TIMEOUT}）")
+    probe_parser.set_defaults(handler=_cmd_probe)
+    
+    args = parser.parse_args(argv)
+    if args.command is None:
+        args = parser.parse_args([*(argv if argv is not None else sys.argv[1:]), "generate"])
+    
+    setup_logging(logging.DEBUG if args.verbose else None)
+    logger.debug(f"模块导入耗时: {MODULE_IMPORT_SECONDS * 1000:.1f}ms")
+    return args.handler(args)
+
+# 模块本身的导入耗时（不含按需加载的依赖），-v 时输出
+MODULE_IMPORT_SECONDS = time.perf_counter() - _MODULE_LOAD_STARTED
+
+if __name__ == "__main__":
+    sys.exit(cli())
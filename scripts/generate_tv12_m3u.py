@@ -1,7 +1,11 @@
 import requests
+import hashlib
 import json
+import os
 import re
-from zhconv import convert  # 用于简繁转换
+from concurrent.futures import ThreadPoolExecutor
+# 频道名称的简繁转换（与 generate_m3u.py 共用，同目录运行）
+import channel_names
 
 # 设置常量
 USER_AGENT = "AptvPlayer/2.7.4"
@@ -19,6 +23,22 @@ CONFIG = {
     ]
 }
 
+# 本地缓存目录（设置环境变量 M3U_CACHE_DIR 后缓存各站点的correctPwd及生成记录，与 generate_m3u.py 共用；
+# 工作流 1-generate_m3u.yaml 通过 actions/cache 在多次运行之间保留该目录）
+CACHE_DIR = os.environ.get("M3U_CACHE_DIR")
+
+# 上次生成的M3U文件所在目录（默认当前目录）：输出会被移到别处提交时，指向已提交的文件以便只更新URL令牌
+PREVIOUS_OUTPUT_DIR = os.environ.get("TV12_PREVIOUS_OUTPUT_DIR", "")
+
+# 脚本自身的版本：脚本改动后不能沿用之前的输出
+with open(__file__, "rb") as _f:
+    GENERATOR_VERSION = hashlib.sha256(_f.read()).hexdigest()[:16]
+
+# 每次生成都会变化的URL令牌（如 /1_1765024729506.m3u8 中的毫秒时间戳）
+URL_TOKEN_PATTERN = re.compile(r'(?<=_)\d{10,13}(?=\.m3u8)')
+# 频道名称中的更新时间（如 "更新1204/18:10"），与URL令牌一样每次生成都会变化
+NAME_TIMESTAMP_PATTERN = re.compile(r'\d{1,4}/\d{1,2}:\d{2}')
+
 def fetch_url(url, description="数据"):
     """通用URL请求函数"""
     headers = {"User-Agent": USER_AGENT}
@@ -39,14 +59,110 @@ def get_correct_pwd(base_url):
             return match.group(1)
     return None
 
-def normalize_channel_name(name):
-    """标准化频道名称（转简体并小写）"""
-    return convert(name.lower(), 'zh-cn')
+def load_json_cache(cache_path, description):
+    """读取缓存目录中的JSON文件（不存在或未启用缓存时返回空字典）"""
+    if not cache_path or not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"读取{description}失败: {e}")
+        return {}
 
-def process_m3u_data():
-    """主处理函数"""
-    # 1. 获取EPG数据
-    epg_data = fetch_url(CONFIG["snow_epg_json"], "EPG信息")
+def save_json_cache(cache_path, data, description):
+    if not cache_path:
+        return
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        tmp_path = f"{cache_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        print(f"写入{description}失败: {e}")
+
+def is_channel_list(text):
+    """判断响应是否为频道列表（密码错误时站点不会返回列表内容）"""
+    return "#genre#" in text or re.search(r",\w+://", text) is not None
+
+def fetch_channel_list(base_url, pwd_cache):
+    """获取站点的频道列表
+    
+    优先使用缓存的correctPwd直接请求列表（密码未更换时只需一次请求），
+    列表请求失败时再从主页获取新的correctPwd；成功时更新 pwd_cache
+    """
+    cached_pwd = pwd_cache.get(base_url)
+    if cached_pwd:
+        list_data = fetch_url(f"{base_url}/list.txt?pwd={cached_pwd}", "频道列表")
+        if list_data and is_channel_list(list_data):
+            return list_data
+        print(f"缓存的correctPwd已失效，重新获取: {base_url}")
+    
+    correct_pwd = get_correct_pwd(base_url)
+    if not correct_pwd:
+        print(f"无法获取 {base_url} 的correctPwd，跳过")
+        return None
+    
+    list_data = fetch_url(f"{base_url}/list.txt?pwd={correct_pwd}", "频道列表")
+    if list_data:
+        pwd_cache[base_url] = correct_pwd
+    return list_data
+
+def normalize_channel_names(names):
+    """批量标准化频道名称（转简体并小写），返回与输入顺序一致的列表"""
+    return channel_names.convert_names_to_simplified([name.lower() for name in names])
+
+def build_epg_index(epg_channels):
+    """EPG频道的 {标准化名称: 频道}，同名时保留最靠前的（与从上往下逐个匹配的结果相同）"""
+    epg_index = {}
+    norm_names = normalize_channel_names([channel["channel_name"] for channel in epg_channels])
+    for channel, norm_name in zip(epg_channels, norm_names):
+        epg_index.setdefault(norm_name, channel)
+    return epg_index
+
+def build_logo_index(logo_datas):
+    """按 logo_json 的顺序合并所有Logo数据为 {标准化名称: Logo URL}，同名时保留优先级最高的"""
+    logo_index = {}
+    for logo_url, logo_data in zip(CONFIG["logo_json"], logo_datas):
+        if not logo_data:
+            continue
+        try:
+            logos = json.loads(logo_data)
+            norm_names = normalize_channel_names([logo["logo_name"] for logo in logos])
+        except:
+            print(f"解析Logo数据失败: {logo_url}")
+            continue
+        for logo, norm_name in zip(logos, norm_names):
+            logo_index.setdefault(norm_name, logo["logo_url"])
+    return logo_index
+
+def parse_channel_list(list_data):
+    """解析频道列表，返回 [(分组, 频道名称, URL)]"""
+    current_group = "默认分组"
+    records = []
+    
+    for line in list_data.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+            
+        # 检查是否是分组行
+        if line.endswith(",#genre#"):
+            current_group = line.replace(",#genre#", "")
+            continue
+            
+        # 解析频道行
+        parts = line.split(",", 1)
+        if len(parts) < 2:
+            continue
+            
+        channel_name, channel_url = parts
+        records.append((current_group, channel_name, channel_url))
+    return records
+
+def build_indexes(epg_data, logo_datas):
+    """解析EPG和Logo数据，返回 (EPG索引, Logo索引)"""
     epg_channels = []
     if epg_data:
         try:
@@ -56,98 +172,169 @@ def process_m3u_data():
     else:
         print("警告: 无法获取EPG数据，将跳过EPG匹配")
     
-    # 2. 获取所有logo数据
-    logo_sources = []
-    for logo_url in CONFIG["logo_json"]:
-        logo_data = fetch_url(logo_url, f"Logo数据({logo_url})")
-        if logo_data:
-            try:
-                logos = json.loads(logo_data)
-                logo_map = {}
-                for logo in logos:
-                    norm_name = normalize_channel_name(logo["logo_name"])
-                    logo_map[norm_name] = logo["logo_url"]
-                logo_sources.append(logo_map)
-            except:
-                print(f"解析Logo数据失败: {logo_url}")
-        else:
-            logo_sources.append({})
+    # EPG频道名称只需标准化一次，建立索引后每个频道只需一次查找
+    epg_index = build_epg_index(epg_channels)
+    # 所有logo数据合并为一个索引
+    logo_index = build_logo_index(logo_datas)
+    return epg_index, logo_index
+
+def build_m3u_lines(records, epg_index, logo_index):
+    """把频道列表转换为M3U行"""
+    m3u_lines = ["#EXTM3U"]
+    
+    # 整个列表的频道名称一次性标准化
+    norm_channel_names = normalize_channel_names([channel_name for _, channel_name, _ in records])
     
-    # 3. 处理每个base_url
-    for output_filename, base_url in CONFIG["base_url"].items():
-        print(f"\n处理 {base_url} -> {output_filename}")
+    for (current_group, channel_name, channel_url), norm_channel_name in zip(records, norm_channel_names):
+        # 匹配EPG和Logo（索引中保留的是从上往下第一个匹配的条目）
+        tvg_id = ""
+        tvg_name = ""
+        epg_channel = epg_index.get(norm_channel_name)
+        if epg_channel:
+            tvg_id = epg_channel["channel_id"]
+            tvg_name = epg_channel["channel_name"]
+        tvg_logo = logo_index.get(norm_channel_name, "")
         
-        # 获取correctPwd
-        correct_pwd = get_correct_pwd(base_url)
-        if not correct_pwd:
-            print(f"无法获取 {base_url} 的correctPwd，跳过")
-            continue
+        # 构建M3U条目
+        attr_parts = []
+        if tvg_id:
+            attr_parts.append(f'tvg-id="{tvg_id}"')
+        if tvg_name:
+            attr_parts.append(f'tvg-name="{tvg_name}"')
+        if tvg_logo:
+            attr_parts.append(f'tvg-logo="{tvg_logo}"')
+        if current_group:
+            attr_parts.append(f'group-title="{current_group}"')
         
-        # 获取频道列表数据
-        list_url = f"{base_url}/list.txt?pwd={correct_pwd}"
-        list_data = fetch_url(list_url, "频道列表")
-        if not list_data:
-            continue
+        attrs = " ".join(attr_parts)
+        m3u_lines.append(f'#EXTINF:-1 {attrs},{channel_name}')
+        m3u_lines.append(channel_url)
+    return m3u_lines
+
+def structure_key(group, channel_name, channel_url):
+    """去掉每次生成都会变化的部分（URL令牌、名称中的更新时间）后的频道条目"""
+    return (group, NAME_TIMESTAMP_PATTERN.sub("#", channel_name), URL_TOKEN_PATTERN.sub("#", channel_url))
+
+_EXTINF_PATTERN = re.compile(r'#EXTINF:-1 ((?:[\w-]+="[^"]*" ?)*),(.*)')
+_GROUP_TITLE_PATTERN = re.compile(r'group-title="([^"]*)"')
+
+def patch_url_tokens(previous_path, output_filename, records):
+    """只更新URL令牌：与上次输出的结构完全相同时沿用其#EXTINF行，只替换URL（及名称中的更新时间）
+    
+    边读取上次的输出（previous_path）边写入临时文件，结构不同（频道、分组、顺序或URL有变化）时放弃并返回False，
+    此时需要完整地重新生成
+    """
+    if not os.path.exists(previous_path):
+        return False
+    tmp_path = f"{output_filename}.tmp"
+    patched = False
+    try:
+        with open(previous_path, "r", encoding="utf-8") as previous, open(tmp_path, "w", encoding="utf-8") as f:
+            if previous.readline().rstrip("\n") != "#EXTM3U":
+                return False
+            f.write("#EXTM3U")
+            pending = iter(records)
+            for extinf_line in previous:
+                extinf_line = extinf_line.rstrip("\n")
+                old_url = previous.readline().rstrip("\n")
+                match = _EXTINF_PATTERN.fullmatch(extinf_line)
+                record = next(pending, None)
+                if match is None or record is None:
+                    return False
+                attrs, old_name = match.groups()
+                group_match = _GROUP_TITLE_PATTERN.search(attrs)
+                old_group = group_match.group(1) if group_match else ""
+                group, channel_name, channel_url = record
+                if structure_key(old_group, old_name, old_url) != structure_key(group, channel_name, channel_url):
+                    return False
+                if channel_name != old_name:
+                    extinf_line = f"#EXTINF:-1 {attrs},{channel_name}"
+                f.write(f"\n{extinf_line}\n{channel_url}")
+            if next(pending, None) is not None:
+                return False
+        os.replace(tmp_path, output_filename)
+        patched = True
+    finally:
+        if not patched and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return True
+
+def file_digest(path):
+    """文件内容的sha256（文件不存在时返回None）"""
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+def inputs_digest(epg_data, logo_datas):
+    """EPG和Logo数据（及脚本、简繁转换的版本）的摘要：摘要不变时上次输出中的tvg属性仍然有效"""
+    digest = hashlib.sha256(f"{GENERATOR_VERSION}:{channel_names.fingerprint()}".encode("utf-8"))
+    for data in [epg_data, *logo_datas]:
+        digest.update(b"\0")
+        digest.update((data or "").encode("utf-8"))
+    return digest.hexdigest()
+
+def process_m3u_data():
+    """主处理函数
+    
+    EPG、Logo和各站点的频道列表并发下载，下载完成后依次生成各站点的M3U文件
+    """
+    pwd_cache_path = os.path.join(CACHE_DIR, "tv12_pwd.json") if CACHE_DIR else None
+    pwd_cache = load_json_cache(pwd_cache_path, "correctPwd缓存")
+    manifest_path = os.path.join(CACHE_DIR, "tv12_manifest.json") if CACHE_DIR else None
+    manifest = load_json_cache(manifest_path, "生成记录")
+    
+    sites = CONFIG["base_url"]
+    with ThreadPoolExecutor(max_workers=1 + len(CONFIG["logo_json"]) + len(sites)) as executor:
+        epg_future = executor.submit(fetch_url, CONFIG["snow_epg_json"], "EPG信息")
+        logo_futures = [executor.submit(fetch_url, logo_url, f"Logo数据({logo_url})") for logo_url in CONFIG["logo_json"]]
+        list_futures = {output_filename: executor.submit(fetch_channel_list, base_url, pwd_cache)
+                        for output_filename, base_url in sites.items()}
         
-        # 解析列表数据并生成M3U
-        current_group = "默认分组"
-        m3u_lines = ["#EXTM3U"]
+        epg_data = epg_future.result()
+        logo_datas = [future.result() for future in logo_futures]
+        digest = inputs_digest(epg_data, logo_datas)
         
-        for line in list_data.splitlines():
-            line = line.strip()
-            if not line:
-                continue
-                
-            # 检查是否是分组行
-            if line.endswith(",#genre#"):
-                current_group = line.replace(",#genre#", "")
-                continue
-                
-            # 解析频道行
-            parts = line.split(",", 1)
-            if len(parts) < 2:
+        # EPG和Logo索引只在需要完整生成时才建立
+        indexes = None
+        
+        for output_filename, base_url in sites.items():
+            print(f"\n处理 {base_url} -> {output_filename}")
+            list_data = list_futures[output_filename].result()
+            if not list_data:
                 continue
-                
-            channel_name, channel_url = parts
-            norm_channel_name = normalize_channel_name(channel_name)
-            
-            # 按照EPG数据从上往下匹配
-            tvg_id = ""
-            tvg_name = ""
-            for channel in epg_channels:
-                if normalize_channel_name(channel["channel_name"]) == norm_channel_name:
-                    tvg_id = channel["channel_id"]
-                    tvg_name = channel["channel_name"]
-                    break
+            records = parse_channel_list(list_data)
             
-            # 匹配Logo
-            tvg_logo = ""
-            for logo_map in logo_sources:
-                if norm_channel_name in logo_map:
-                    tvg_logo = logo_map[norm_channel_name]
-                    break
+            # 大多数情况下只有URL令牌变化：结构与上次的输出相同时直接修补，不需要建立EPG和Logo索引
+            previous_path = os.path.join(PREVIOUS_OUTPUT_DIR, output_filename)
+            built = manifest.get(output_filename)
+            if not isinstance(built, dict):
+                built = {}
+            # 上次的输出就是记录中的那一份且EPG和Logo数据未变时，其中的tvg属性仍然有效
+            verified = built.get("inputs") == digest and built.get("output") == file_digest(previous_path)
+            # 没有可用的记录（首次运行、缓存丢失、上次的输出来自其他运行）时同样沿用上次输出中的tvg属性，
+            # 但不记录输入摘要，下次运行完整生成一次；记录显示EPG或Logo数据已变化（或上次未核对）时直接完整生成
+            stale = "inputs" in built and built["inputs"] != digest
+            patched = not stale and patch_url_tokens(previous_path, output_filename, records)
             
-            # 构建M3U条目
-            attr_parts = []
-            if tvg_id:
-                attr_parts.append(f'tvg-id="{tvg_id}"')
-            if tvg_name:
-                attr_parts.append(f'tvg-name="{tvg_name}"')
-            if tvg_logo:
-                attr_parts.append(f'tvg-logo="{tvg_logo}"')
-            if current_group:
-                attr_parts.append(f'group-title="{current_group}"')
-            
-            attrs = " ".join(attr_parts)
-            m3u_lines.append(f'#EXTINF:-1 {attrs},{channel_name}')
-            m3u_lines.append(channel_url)
-        
-        # 写入文件
-        with open(output_filename, "w", encoding="utf-8") as f:
-            f.write("\n".join(m3u_lines))
-        
-        print(f"M3U文件已生成: {output_filename}")
+            if patched:
+                print(f"频道列表结构未变化，仅更新URL令牌: {output_filename}")
+            else:
+                verified = True
+                if indexes is None:
+                    indexes = build_indexes(epg_data, logo_datas)
+                m3u_lines = build_m3u_lines(records, *indexes)
+                
+                # 写入文件
+                with open(output_filename, "w", encoding="utf-8") as f:
+                    f.write("\n".join(m3u_lines))
+                
+                print(f"M3U文件已生成: {output_filename}")
+            manifest[output_filename] = {"inputs": digest if verified else None, "output": file_digest(output_filename)}
     
+    save_json_cache(pwd_cache_path, pwd_cache, "correctPwd缓存")
+    save_json_cache(manifest_path, manifest, "生成记录")
     return True
 
 if __name__ == "__main__":
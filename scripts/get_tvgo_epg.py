@@ -1,126 +1,437 @@
 import requests
-import xml.etree.ElementTree as ET
 from datetime import datetime, timedelta
-from xml.dom import minidom
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import gzip
+import os
 import re
 import json
+import random
+import threading
+import time
 
-def get_tvgo_epg():
-    # 频道信息 - 可以扩展为多个频道
-    channels = [
-        {"id": "325", "name": "DAZN 1"}
-        # 可以在这里添加更多频道
-        # {"id": "326", "name": "DAZN 2"},
-        # {"id": "327", "name": "其他频道"},
-    ]
+# 输出文件，以 .gz 结尾时写入gzip压缩的XMLTV
+OUTPUT_FILE = os.environ.get("TVGO_EPG_OUTPUT", "tvgo.xml")
+
+# 默认的频道列表；设置 TVGO_CHANNELS 为JSON文件路径时从文件读取，格式相同：[{"id": "325", "name": "DAZN 1"}, ...]
+DEFAULT_CHANNELS = [
+    {"id": "325", "name": "DAZN 1"}
+    # 可以在这里添加更多频道
+    # {"id": "326", "name": "DAZN 2"},
+    # {"id": "327", "name": "其他频道"},
+]
+CHANNELS_FILE = os.environ.get("TVGO_CHANNELS")
+
+EPG_URL_TEMPLATE = "https://tvking.funorange.com.tw/channel/{id}"
+
+# 并发获取频道页面的线程数、同一主机的最大并发请求数及相邻两次请求的最小间隔（秒）
+MAX_WORKERS = int(os.environ.get("TVGO_MAX_WORKERS", "8"))
+MAX_REQUESTS_PER_HOST = int(os.environ.get("TVGO_MAX_REQUESTS_PER_HOST", "4"))
+MIN_REQUEST_INTERVAL = float(os.environ.get("TVGO_MIN_REQUEST_INTERVAL", "0.2"))
+
+# 请求超时（连接, 读取）秒数及失败后的重试次数
+REQUEST_TIMEOUT = (10, float(os.environ.get("TVGO_TIMEOUT", "30")))
+MAX_RETRIES = int(os.environ.get("TVGO_MAX_RETRIES", "3"))
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+def load_channels(path=None):
+    """读取频道列表配置，未配置时使用 DEFAULT_CHANNELS"""
+    path = path or CHANNELS_FILE
+    if not path:
+        return DEFAULT_CHANNELS
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+class HostRateLimiter:
+    """按主机限制请求：同时进行的请求数不超过 max_concurrent，相邻两次请求的开始时间至少间隔 min_interval 秒"""
+
+    def __init__(self, max_concurrent=MAX_REQUESTS_PER_HOST, min_interval=MIN_REQUEST_INTERVAL):
+        self.max_concurrent = max_concurrent
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._next_start = {}
+
+    def _semaphore(self, host):
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.max_concurrent)
+                self._semaphores[host] = semaphore
+            return semaphore
+
+    def acquire(self, url):
+        """等待直到可以向URL所在主机发送请求，返回需要在请求结束后 release 的信号量"""
+        host = urlsplit(url).netloc
+        semaphore = self._semaphore(host)
+        semaphore.acquire()
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+        return semaphore
+
+class PageFetcher:
+    """并发获取页面：共享带连接池的会话，按主机限速，超时及失败后按指数退避重试"""
+
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+
+    def __init__(self, max_workers=MAX_WORKERS, timeout=REQUEST_TIMEOUT, max_retries=MAX_RETRIES, rate_limiter=None):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.rate_limiter = rate_limiter or HostRateLimiter()
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=max(max_workers, 10))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def fetch(self, url):
+        """获取页面文本，重试后仍失败时抛出 requests.RequestException"""
+        for attempt in range(self.max_retries + 1):
+            semaphore = self.rate_limiter.acquire(url)
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+                if response.status_code not in self.RETRY_STATUS or attempt == self.max_retries:
+                    response.raise_for_status()
+                    return response.text
+                error = requests.HTTPError(f"{response.status_code} Server Error for url: {url}", response=response)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                error = e
+            finally:
+                semaphore.release()
+            delay = 2 ** attempt + random.uniform(0, 1)
+            print(f"请求失败（{error}），{delay:.1f} 秒后重试 ({attempt + 1}/{self.max_retries})")
+            time.sleep(delay)
+
+    def submit(self, url):
+        return self.executor.submit(self.fetch, url)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+def escape_xml(value):
+    """转义XML文本和属性值（与 minidom 输出的转义方式一致）"""
+    return value.replace("&", "&amp;").replace("<", "&lt;").replace('"', "&quot;").replace(">", "&gt;")
+
+class XmltvWriter:
+    """逐个元素写入XMLTV文件，不在内存中保留整个文档
     
-    # 创建XMLTV根元素
-    tv = ET.Element('tv')
-    tv.set('generator-info-name', 'yufeilai666')
-    tv.set('generator-info-url', 'https://github.com/yufeilai666')
-    tv.set('source-info-name', 'TVKing')
-    tv.set('source-info-url', 'https://tvking.funorange.com.tw')
+    输出格式与之前 ElementTree + minidom.toprettyxml(indent="  ") 的结果一致。
+    先写入临时文件，关闭时替换目标文件；路径以 .gz 结尾时写入gzip压缩的文件
+    """
+
+    def __init__(self, path, tv_attrs):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.tv_attrs = tv_attrs
+        self.started = False
+        self.raw = open(self.tmp_path, "wb")
+        if path.endswith(".gz"):
+            # gzip头中记录目标文件名（而不是临时文件名）且 mtime=0：内容不变时压缩文件也完全相同
+            self.file = gzip.GzipFile(os.path.basename(path), "wb", fileobj=self.raw, mtime=0)
+        else:
+            self.file = self.raw
+        self._write('<?xml version="1.0" encoding="utf-8"?>\n')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._close_files()
+            os.remove(self.tmp_path)
+
+    def _close_files(self):
+        # GzipFile 不会关闭传入的 fileobj
+        self.file.close()
+        self.raw.close()
+
+    def _write(self, text):
+        self.file.write(text.encode("utf-8"))
+
+    @staticmethod
+    def _format_attrs(attrs):
+        return "".join(f' {name}="{escape_xml(value)}"' for name, value in attrs.items())
+
+    def _start(self):
+        # <tv> 的开始标签在写入第一个子元素时才输出（没有子元素时与 minidom 一样输出 <tv .../>）
+        if not self.started:
+            self._write(f"<tv{self._format_attrs(self.tv_attrs)}>\n")
+            self.started = True
+
+    def _text_element(self, indent, tag, attrs, text):
+        if text:
+            return f"{indent}<{tag}{self._format_attrs(attrs)}>{escape_xml(text)}</{tag}>\n"
+        return f"{indent}<{tag}{self._format_attrs(attrs)}/>\n"
+
+    def write_channel(self, channel_id, display_name):
+        self._start()
+        self._write(f'  <channel{self._format_attrs({"id": channel_id})}>\n'
+                    f'{self._text_element("    ", "display-name", {"lang": "zh"}, display_name)}'
+                    f'  </channel>\n')
+
+    def write_programme(self, channel_id, start, stop, title):
+        self._start()
+        self._write(f'  <programme{self._format_attrs({"channel": channel_id, "start": start, "stop": stop})}>\n'
+                    f'{self._text_element("    ", "title", {"lang": "zh"}, title)}'
+                    f'  </programme>\n')
+
+    def close(self):
+        if self.started:
+            self._write("</tv>\n")
+        else:
+            self._write(f"<tv{self._format_attrs(self.tv_attrs)}/>\n")
+        self._close_files()
+        os.replace(self.tmp_path, self.path)
+
+def get_tvgo_epg(output_file=None, channels=None):
+    # 频道信息 - 在 DEFAULT_CHANNELS 或 TVGO_CHANNELS 指定的文件中扩展为多个频道
+    if channels is None:
+        channels = load_channels()
     
-    for channel in channels:
-        # 构建EPG URL
-        epg_url = f"https://tvking.funorange.com.tw/channel/{channel['id']}"
-        
-        try:
-            print(f"正在获取频道 {channel['name']} 的EPG数据...")
-            
-            # 发送请求获取网页HTML
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            response = requests.get(epg_url, headers=headers)
-            response.raise_for_status()
-            
-            # 从HTML中提取Vue数据
-            schedule_data = extract_vue_data_eval(response.text)
-            
-            if not schedule_data:
-                print(f"警告: 无法从频道 {channel['name']} 的HTML中提取数据")
-                continue
-            
-            # 添加频道信息到XML
-            channel_element = ET.SubElement(tv, 'channel')
-            channel_element.set('id', channel['name'])
-            
-            display_name = ET.SubElement(channel_element, 'display-name')
-            display_name.set('lang', 'zh')
-            display_name.text = channel['name']
-            
-            # 处理节目数据
-            process_schedule_data(tv, channel['name'], schedule_data)
-            
-            print(f"频道 {channel['name']} 处理完成")
-            
-        except requests.RequestException as e:
-            print(f"请求频道 {channel['name']} 的EPG数据失败: {e}")
-        except Exception as e:
-            print(f"处理频道 {channel['name']} 数据时发生错误: {e}")
+    output_file = output_file or OUTPUT_FILE
+    
+    # XMLTV根元素的属性
+    tv_attrs = {
+        'generator-info-name': 'yufeilai666',
+        'generator-info-url': 'https://github.com/yufeilai666',
+        'source-info-name': 'TVKing',
+        'source-info-url': 'https://tvking.funorange.com.tw',
+    }
     
-    # 生成格式化的XML
     try:
-        xml_str = minidom.parseString(ET.tostring(tv, encoding='utf-8')).toprettyxml(indent="  ", encoding='utf-8')
-        
-        # 写入文件
-        with open('tvgo.xml', 'wb') as f:
-            f.write(xml_str)
-            
-        print(f"EPG数据已成功写入 tvgo.xml")
-        
+        writer = XmltvWriter(output_file, tv_attrs)
     except Exception as e:
         print(f"写入XML文件时发生错误: {e}")
+        return
+    
+    # 所有频道的页面同时开始获取，总耗时取决于最慢的页面；按配置顺序依次写入
+    fetcher = PageFetcher(max_workers=max(1, min(MAX_WORKERS, len(channels))))
+    try:
+        with writer:
+            futures = []
+            for channel in channels:
+                print(f"正在获取频道 {channel['name']} 的EPG数据...")
+                futures.append(fetcher.submit(EPG_URL_TEMPLATE.format(id=channel['id'])))
+            for channel, future in zip(channels, futures):
+                process_channel(writer, channel, future)
+    finally:
+        fetcher.close()
+    
+    print(f"EPG数据已成功写入 {output_file}")
 
-def extract_vue_data_eval(html_content):
-    """
-    使用eval方法提取Vue数据（仅在安全环境下使用）
-    """
+def process_channel(writer, channel, page_future):
+    """处理单个频道的页面并写入XMLTV（频道的所有节目处理完成后才写入，出错时不会留下不完整的频道）"""
     try:
-        # 查找scheduleList数组
-        start_marker = 'scheduleList: ['
-        start_idx = html_content.find(start_marker)
-        if start_idx == -1:
-            return None
-            
-        # 从开始位置查找数组的结束位置
-        bracket_count = 0
-        i = start_idx + len(start_marker) - 1  # 从'['开始
+        html = page_future.result()
         
-        while i < len(html_content):
-            char = html_content[i]
-            if char == '[':
-                bracket_count += 1
-            elif char == ']':
-                bracket_count -= 1
-                if bracket_count == 0:
-                    # 找到了匹配的结束括号
-                    end_idx = i + 1
-                    break
-            i += 1
-        else:
-            # 没有找到匹配的结束括号
-            return None
+        # 从HTML中提取Vue数据
+        schedule_data = extract_schedule_list(html)
         
-        # 提取数组字符串
-        array_str = html_content[start_idx + len(start_marker) - 1:end_idx]
+        if not schedule_data:
+            print(f"警告: 无法从频道 {channel['name']} 的HTML中提取数据")
+            return
         
-        # 使用eval解析（注意：仅在可信环境下使用）
-        # 将单引号替换为双引号，使eval可以处理
-        array_str = array_str.replace("'", '"')
+        # 处理节目数据，写入频道信息及节目
+        programmes = list(iter_programmes(schedule_data))
+        writer.write_channel(channel['name'], channel['name'])
+        for start, stop, title in programmes:
+            writer.write_programme(channel['name'], start, stop, title)
         
-        # 使用eval解析
-        schedule_data = eval(array_str)
-        return schedule_data
+        print(f"频道 {channel['name']} 处理完成")
         
+    except requests.RequestException as e:
+        print(f"请求频道 {channel['name']} 的EPG数据失败: {e}")
     except Exception as e:
-        print(f"使用eval提取Vue数据时发生错误: {e}")
+        print(f"处理频道 {channel['name']} 数据时发生错误: {e}")
+
+# Vue数据中 scheduleList 数组的开始位置
+_SCHEDULE_LIST_PATTERN = re.compile(r'\bscheduleList\s*:\s*\[')
+
+# JS对象字面量的词法单元（前面可以有空白和注释）；字符串按引号整体匹配，其中的括号和引号不会被误认。
+# 空白逐个字符匹配、注释只能在行尾或第一个 */ 处结束，前导内容只有一种划分方式，
+# 匹配失败时回溯的次数与其长度成线性关系（写成 \s+ 会在连续空白上指数级回溯）
+_JS_TOKEN_PATTERN = re.compile(r"""
+    (?:\s|//[^\n]*(?![^\n])|/\*(?:[^*]|\*(?!/))*\*/)*
+    (?:
+        (?P<punct>[\[\]{},:])
+      | (?P<string>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*'|`(?:[^`\\$]|\\.|\$(?!\{))*`)
+      | (?P<number>[+-]?(?:0[xX][0-9a-fA-F]+|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?))
+      | (?P<ident>[A-Za-z_$][\w$]*)
+    )""", re.VERBOSE | re.DOTALL)
+
+# 查找数组结束位置：字符串、注释及其他不含方括号的内容整段跳过，只有方括号需要逐个处理
+_JS_BRACKET_SCAN_PATTERN = re.compile(r"""
+    (?:
+        [^\[\]'"`/]+
+      | "(?:[^"\\\n]|\\.)*" | '(?:[^'\\\n]|\\.)*' | `(?:[^`\\]|\\.)*`
+      | //[^\n]* | /\*.*?\*/ | /
+    )*
+    (?P<bracket>[\[\]])?""", re.VERBOSE | re.DOTALL)
+
+_JS_ESCAPE_PATTERN = re.compile(r"\\(?:x([0-9a-fA-F]{2})|u\{([0-9a-fA-F]+)\}|u([0-9a-fA-F]{4})|(\r\n|[\s\S]))")
+_JS_SIMPLE_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", "v": "\v", "0": "\0",
+                      "\n": "", "\r\n": "", "\u2028": "", "\u2029": ""}
+
+# parse_js_literal 的解析状态
+_VALUE, _KEY, _COLON, _SEPARATOR = "value", "key", "colon", "separator"
+
+_JS_KEYWORDS = {"true": True, "false": False, "null": None, "undefined": None,
+                "NaN": float("nan"), "Infinity": float("inf")}
+
+def _decode_js_escape(match):
+    hex_byte, code_point, code_unit, char = match.groups()
+    if char is not None:
+        return _JS_SIMPLE_ESCAPES.get(char, char)
+    return chr(int(hex_byte or code_point or code_unit, 16))
+
+def _decode_js_string(token):
+    body = token[1:-1]
+    if "\\" not in body:
+        return body
+    # \uD83D\uDE00 这样的代理对解码后合并为一个字符
+    return _JS_ESCAPE_PATTERN.sub(_decode_js_escape, body).encode("utf-16", "surrogatepass").decode("utf-16")
+
+def _decode_js_number(token):
+    if token.lstrip("+-")[:2] in ("0x", "0X"):
+        return int(token, 16)
+    if any(c in token for c in ".eE"):
+        return float(token)
+    return int(token)
+
+def parse_js_literal(text, pos=0):
+    """解析从 pos 开始的JS字面量（对象、数组、字符串、数字、true/false/null），返回 (值, 结束位置)
+    
+    直接转换为Python的 dict/list 等；每个词法单元只用一次正则匹配，总耗时与文本长度成线性关系。
+    支持单引号和双引号字符串、不带引号的键、末尾多余的逗号及注释。只解析字面量，不执行任何代码
+    """
+    match_token = _JS_TOKEN_PATTERN.match
+    # 外层尚未结束的数组/对象：[(容器, 当前容器在其中对应的键)]
+    stack = []
+    container = None
+    key = None
+    # 下一个词法单元应当是：VALUE 值，KEY 对象的键，COLON 冒号，SEPARATOR 逗号或结束括号
+    expect = _VALUE
+    while True:
+        match = match_token(text, pos)
+        if match is None:
+            raise ValueError(f"无法解析的内容（位置 {pos}）: {text[pos:pos + 30]!r}")
+        pos = match.end()
+        kind = match.lastgroup
+        token = match.group(kind)
+        
+        if expect is _VALUE:
+            if kind == "string":
+                value = _decode_js_string(token)
+            elif kind == "punct":
+                if token == "[" or token == "{":
+                    stack.append((container, key))
+                    if token == "[":
+                        container, expect = [], _VALUE
+                    else:
+                        container, expect = {}, _KEY
+                    continue
+                if token != "]" or type(container) is not list:
+                    raise ValueError(f"缺少值（位置 {pos}）")
+                # 空数组或末尾多余的逗号
+                value = container
+                container, key = stack.pop()
+            elif kind == "number":
+                value = _decode_js_number(token)
+            elif token in _JS_KEYWORDS:
+                value = _JS_KEYWORDS[token]
+            else:
+                raise ValueError(f"不支持的内容 {token!r}（位置 {pos}）")
+        elif expect is _SEPARATOR:
+            if token == ",":
+                expect = _KEY if type(container) is dict else _VALUE
+                continue
+            if kind != "punct" or token != ("]" if type(container) is list else "}"):
+                raise ValueError(f"缺少逗号（位置 {pos}）")
+            value = container
+            container, key = stack.pop()
+        elif expect is _KEY:
+            if kind == "string":
+                key = _decode_js_string(token)
+            elif kind == "ident" or kind == "number":
+                key = token
+            elif token == "}":
+                # 空对象或末尾多余的逗号
+                value = container
+                container, key = stack.pop()
+                expect = _SEPARATOR
+            else:
+                raise ValueError(f"无效的键 {token!r}（位置 {pos}）")
+            if expect is _KEY:
+                expect = _COLON
+                continue
+        else:
+            if token != ":" or kind != "punct":
+                raise ValueError(f"键 {key!r} 后缺少冒号（位置 {pos}）")
+            expect = _VALUE
+            continue
+        
+        # 得到一个完整的值：放入当前容器，或者已经是最外层的值
+        if container is None:
+            return value, pos
+        if type(container) is list:
+            container.append(value)
+        else:
+            container[key] = value
+        expect = _SEPARATOR
+
+def find_js_array_end(text, pos):
+    """返回从 pos（'['）开始的数组的结束位置（']' 之后），字符串和注释中的方括号不计入"""
+    depth = 0
+    while True:
+        match = _JS_BRACKET_SCAN_PATTERN.match(text, pos)
+        bracket = match.group("bracket")
+        if bracket is None:
+            raise ValueError(f"数组没有结束（位置 {match.end()}）")
+        pos = match.end()
+        depth += 1 if bracket == "[" else -1
+        if depth == 0:
+            return pos
+
+def extract_schedule_list(html_content):
+    """
+    从页面的Vue数据中提取 scheduleList 数组（字符串中的引号和括号不影响解析）
+    
+    数组中没有双引号和反斜杠时，每个单引号都是字符串的边界，换成双引号后就是JSON，直接用 json.loads 解析；
+    JSON无法解析（不带引号的键、末尾多余的逗号、注释等）或含有双引号、转义字符时使用 parse_js_literal
+    """
+    match = _SCHEDULE_LIST_PATTERN.search(html_content)
+    if match is None:
+        return None
+    try:
+        start = match.end() - 1
+        literal = html_content[start:find_js_array_end(html_content, start)]
+        if '"' not in literal and "\\" not in literal:
+            try:
+                return json.loads(literal.replace("'", '"'))
+            except ValueError:
+                pass
+        schedule_data, _ = parse_js_literal(literal)
+        return schedule_data
+    except ValueError as e:
+        print(f"解析Vue数据时发生错误: {e}")
         return None
 
-def process_schedule_data(tv, channel_name, schedule_data):
+def iter_programmes(schedule_data):
     """
-    处理节目数据并添加到XML
+    处理节目数据，逐个产出 (开始时间, 结束时间, 节目标题)（XMLTV时间格式）
     """
     for day_schedule in schedule_data:
         date_str = day_schedule.get('date', '')
@@ -145,16 +456,7 @@ def process_schedule_data(tv, channel_name, schedule_data):
                 next_day = (datetime.strptime(date_str, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
                 end_datetime = f"{next_day} {time_end}"
             
-            # 创建节目元素
-            programme = ET.SubElement(tv, 'programme')
-            programme.set('channel', channel_name)
-            programme.set('start', format_datetime(start_datetime))
-            programme.set('stop', format_datetime(end_datetime))
-            
-            # 添加节目标题
-            title = ET.SubElement(programme, 'title')
-            title.set('lang', 'zh')
-            title.text = program_title
+            yield format_datetime(start_datetime), format_datetime(end_datetime), program_title
 
 def format_datetime(datetime_str):
     """